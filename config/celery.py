@@ -1,9 +1,25 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def _reset_metrics_dir(**_kwargs):
+    from pages.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+
+@worker_process_shutdown.connect
+def _mark_metrics_process_dead(pid=None, **_kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,31 @@
+import os
+
+bind = "0.0.0.0:8000"
+# Import Django, the URLconf and every view once in the master; workers are
+# forked with it all loaded, so boot and max_requests recycling cost a fork
+# instead of a full import. Connections (DB, Redis, broker) are opened
+# lazily and therefore never shared across the fork.
+preload_app = True
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    from pages.metrics import reset_multiprocess_dir
+
+    reset_multiprocess_dir()
+
+
+def when_ready(server):
+    # The URLconf (views, serializers, admin) loads on the first request;
+    # with preload_app do it here so forked workers inherit it too.
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,94 @@
+"""Database routing for read replicas.
+
+Everything goes to ``default`` unless code explicitly opts in with
+``read_from_replica()``; each such block reads from one replica picked at
+random from ``DATABASE_REPLICAS`` on its first read, so a response never
+mixes rows from replicas at different lag. A replica lagging more than
+``DATABASE_REPLICA_MAX_LAG`` seconds (or failing the lag check) is skipped
+until its next check, and reads fall back to the primary when no replica is
+usable. Writes, migrations, the admin and Celery tasks always use the primary.
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# None outside read_from_replica(); inside, {"alias": replica picked or None}
+_USE_REPLICA: ContextVar[dict | None] = ContextVar("use_replica", default=None)
+# alias -> (checked_at, healthy)
+_LAG_STATE: dict[str, tuple[float, bool]] = {}
+
+_LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+@contextmanager
+def read_from_replica():
+    token = _USE_REPLICA.set({"alias": None})
+    try:
+        yield
+    finally:
+        _USE_REPLICA.reset(token)
+
+
+def replica_lag(alias: str) -> float:
+    """Replication delay of ``alias`` in seconds (0 for non-PostgreSQL)."""
+    conn = connections[alias]
+    if conn.vendor != "postgresql":
+        return 0.0
+    timeout = int(getattr(settings, "DATABASE_REPLICA_CONNECT_TIMEOUT", 2))
+    with conn.cursor() as cur:
+        # Runs inside a live request: a stuck replica must not hold it up
+        cur.execute("SET statement_timeout = %s", [timeout * 1000])
+        try:
+            cur.execute(_LAG_SQL)
+            row = cur.fetchone()
+        finally:
+            cur.execute("RESET statement_timeout")
+    return float(row[0] or 0.0)
+
+
+def _is_healthy(alias: str) -> bool:
+    interval = float(getattr(settings, "DATABASE_REPLICA_LAG_CHECK_INTERVAL", 2.0))
+    now = time.monotonic()
+    checked_at, healthy = _LAG_STATE.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < interval:
+        return healthy
+    max_lag = float(getattr(settings, "DATABASE_REPLICA_MAX_LAG", 5.0))
+    try:
+        healthy = replica_lag(alias) <= max_lag
+    except DatabaseError:
+        healthy = False
+    _LAG_STATE[alias] = (now, healthy)
+    return healthy
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _USE_REPLICA.get()
+        if state is None:
+            return "default"
+        if state["alias"] is None:
+            replicas = [
+                alias
+                for alias in getattr(settings, "DATABASE_REPLICAS", [])
+                if _is_healthy(alias)
+            ]
+            state["alias"] = random.choice(replicas) if replicas else "default"
+        return state["alias"]
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any alias may relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
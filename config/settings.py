@@ -24,7 +24,8 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # No autodiscover at setup; config/urls.py runs it when the URLconf loads
+    "django.contrib.admin.apps.SimpleAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -37,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "pages.metrics.MetricsMiddleware",
+    "pages.profiling.RequestProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -73,6 +76,11 @@ RUNNING_TESTS = bool(os.environ.get("PYTEST_CURRENT_TEST")) or (
     "pytest" in " ".join(sys.argv).lower() or "test" in sys.argv
 )
 
+# Seconds a replica gets to connect or answer the lag check (integer: libpq)
+DATABASE_REPLICA_CONNECT_TIMEOUT = env.int(
+    "DATABASE_REPLICA_CONNECT_TIMEOUT", default=2
+)
+
 # Use Postgres in normal runtime when requested via env;
 # force SQLite during tests to avoid external dependencies.
 if env("USE_POSTGRES") and not RUNNING_TESTS:
@@ -86,6 +94,17 @@ if env("USE_POSTGRES") and not RUNNING_TESTS:
             "PORT": env("POSTGRES_PORT"),
         }
     }
+    # Read replicas: comma-separated "host[:port]" list, same credentials
+    for i, replica in enumerate(env.list("POSTGRES_REPLICA_HOSTS", default=[])):
+        host, _, port = replica.partition(":")
+        DATABASES[f"replica{i}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "PORT": port or env("POSTGRES_PORT"),
+            # Replicas are lag-checked inside live requests: fail fast
+            "OPTIONS": {"connect_timeout": DATABASE_REPLICA_CONNECT_TIMEOUT},
+            "TEST": {"MIRROR": "default"},
+        }
 else:
     DATABASES = {
         "default": {
@@ -94,6 +113,15 @@ else:
         }
     }
 
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica")]
+DATABASE_ROUTERS = ["config.routers.ReplicaRouter"]
+# Replicas lagging more than this (sec.) are skipped; lag is re-checked every
+# DATABASE_REPLICA_LAG_CHECK_INTERVAL seconds per process.
+DATABASE_REPLICA_MAX_LAG = env.float("DATABASE_REPLICA_MAX_LAG", default=5.0)
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = env.float(
+    "DATABASE_REPLICA_LAG_CHECK_INTERVAL", default=2.0
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"
@@ -137,17 +165,85 @@ CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND", default="redis://redis:6379
 # Dedicated Redis for counters buffer (separate DB by default)
 COUNTER_REDIS_URL = env("COUNTER_REDIS_URL", default="redis://redis:6379/1")
 COUNTER_DEDUP_TTL = env.int("COUNTER_DEDUP_TTL", default=900)
+# Ingest tasks run on their own queue and are batched on the worker: one
+# execution handles up to COUNTER_INGEST_BATCH_SIZE messages, or whatever
+# arrived within COUNTER_INGEST_BATCH_INTERVAL seconds.
+COUNTER_INGEST_QUEUE = "ingest"
+COUNTER_INGEST_BATCH_SIZE = env.int("COUNTER_INGEST_BATCH_SIZE", default=500)
+COUNTER_INGEST_BATCH_INTERVAL = env.float("COUNTER_INGEST_BATCH_INTERVAL", default=1.0)
+# Flush fan-out: per-label/per-chunk tasks on the flush queue, with at most
+# COUNTER_FLUSH_MAX_WRITERS chunks writing to the DB at the same time.
+COUNTER_FLUSH_QUEUE = "flush"
+COUNTER_FLUSH_MAX_WRITERS = env.int("COUNTER_FLUSH_MAX_WRITERS", default=2)
+COUNTER_FLUSH_WRITER_TTL = env.int("COUNTER_FLUSH_WRITER_TTL", default=60)
+# Retries (exponential backoff, up to 5 min apart) of a chunk whose DB write
+# fails; flush_label has already removed its deltas from Redis
+COUNTER_FLUSH_DB_RETRIES = env.int("COUNTER_FLUSH_DB_RETRIES", default=10)
+# Temp flush keys idle longer than this (sec.) are reported as orphaned
+COUNTER_FLUSH_ORPHAN_AGE = env.int("COUNTER_FLUSH_ORPHAN_AGE", default=300)
+
+# Django cache (page->contents maps for the impression beacon)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_REDIS_URL", default="redis://redis:6379/2"),
+    }
+}
+PAGE_CONTENTS_CACHE_TTL = env.int("PAGE_CONTENTS_CACHE_TTL", default=300)
+
+# HTTP caching of anonymous page list/detail responses in nginx (0 = off).
+API_CACHE_MAX_AGE = env.int("API_CACHE_MAX_AGE", default=0)
+# Where page views are counted, exactly one of:
+# - "request": PageViewSet.retrieve (views served from nginx cache are lost)
+# - "beacon": the impression beacon that nginx mirrors every detail request to
+# - "log": the ingest_impression_log command reading nginx's impressions log
+IMPRESSIONS_SOURCE = env("IMPRESSIONS_SOURCE", default="request")
+# nginx base URLs refreshed on page/content changes, e.g. "http://nginx"
+API_CACHE_PURGE_ENDPOINTS = env.list("API_CACHE_PURGE_ENDPOINTS", default=[])
+API_CACHE_PURGE_HOST = env("API_CACHE_PURGE_HOST", default="")
+# Shared secret nginx expects in X-Cache-Purge (nginx/templates/purge.conf.template)
+API_CACHE_PURGE_TOKEN = env("API_CACHE_PURGE_TOKEN", default="")
+
+# Opt-in request profiler: Server-Timing headers + slow request samples in admin
+REQUEST_PROFILER_ENABLED = env.bool("REQUEST_PROFILER_ENABLED", default=False)
+REQUEST_PROFILER_SLOW_MS = env.float("REQUEST_PROFILER_SLOW_MS", default=500)
+REQUEST_PROFILER_BUFFER_SIZE = env.int("REQUEST_PROFILER_BUFFER_SIZE", default=100)
+
+# Readiness probe (/ready/): per-dependency timeout and result cache (sec.)
+READINESS_PROBE_TIMEOUT = env.float("READINESS_PROBE_TIMEOUT", default=0.5)
+READINESS_CACHE_TTL = env.float("READINESS_CACHE_TTL", default=2.0)
+
+# Prometheus: each process family (gunicorn, celery) writes its metrics to its
+# own PROMETHEUS_MULTIPROC_DIR; /metrics aggregates every dir listed here.
+METRICS_MULTIPROC_DIRS = [
+    d.strip()
+    for d in env(
+        "METRICS_MULTIPROC_DIRS", default=os.environ.get("PROMETHEUS_MULTIPROC_DIR", "")
+    ).split(",")
+    if d.strip()
+]
 
 # Celery reliability and beat config
 CELERY_TASK_ACKS_LATE = True
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 CELERY_TASK_PUBLISH_RETRY = True
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+# Queues: "ingest" (tiny, high volume), "flush" (DB writes), "celery" (the
+# rest, e.g. cache purges). Each gets its own worker profile in
+# docker-compose.yaml so flushes never wait behind a flood of ingests.
+CELERY_TASK_DEFAULT_QUEUE = "celery"
+CELERY_TASK_ROUTES = {
+    "pages.tasks.ingest_impressions": {"queue": COUNTER_INGEST_QUEUE},
+    "pages.tasks.ingest_impression_counts": {"queue": COUNTER_INGEST_QUEUE},
+    "pages.tasks.flush_impressions": {"queue": COUNTER_FLUSH_QUEUE},
+    "pages.tasks.flush_label": {"queue": COUNTER_FLUSH_QUEUE},
+    "pages.tasks.flush_chunk": {"queue": COUNTER_FLUSH_QUEUE},
+}
 CELERY_BEAT_SCHEDULE = {
     "flush-impressions": {
         "task": "pages.tasks.flush_impressions",
         "schedule": 1.0,
-        "options": {"queue": "batch"},
+        "options": {"queue": COUNTER_FLUSH_QUEUE},
     }
 }
 
@@ -161,3 +257,5 @@ if RUNNING_TESTS:
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    DATABASE_REPLICAS = []
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -1,32 +1,67 @@
 from django.contrib import admin
 from django.http import JsonResponse
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from django.utils.module_loading import import_string
+
+from pages.health import readiness
+from pages.metrics import metrics_view
+
+# Admin modules (ModelAdmins, forms, widgets) are imported here rather than
+# at django.setup() (see SimpleAdminConfig in settings): Celery workers and
+# management commands never load them.
+admin.autodiscover()
 
 
 def health(_request):
     return JsonResponse({"status": "ok"})
 
 
+class LazyView:
+    """A class-based view imported on its first use instead of at startup.
+
+    For rarely hit views with heavy imports (drf_spectacular pulls in the
+    schema generator and extra renderers, ~0.1s per process). ``cls`` and
+    ``initkwargs`` mirror ``as_view()`` so schema generation still sees it.
+    """
+
+    csrf_exempt = True
+
+    def __init__(self, dotted_path: str, **initkwargs):
+        self.dotted_path = dotted_path
+        self.initkwargs = initkwargs
+        self._view = None
+
+    @property
+    def cls(self):
+        return import_string(self.dotted_path)
+
+    def __call__(self, request, *args, **kwargs):
+        if self._view is None:
+            self._view = self.cls.as_view(**self.initkwargs)
+        return self._view(request, *args, **kwargs)
+
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("health/", health, name="health"),
+    path("ready/", readiness, name="ready"),
+    path("metrics", metrics_view, name="metrics"),
     # Versioned API (v1)
     path("api/v1/", include("pages.urls")),
     # OpenAPI schema and docs
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path(
+        "api/schema/",
+        LazyView("drf_spectacular.views.SpectacularAPIView"),
+        name="schema",
+    ),
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        LazyView("drf_spectacular.views.SpectacularSwaggerView", url_name="schema"),
         name="swagger-ui",
     ),
     path(
         "api/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
+        LazyView("drf_spectacular.views.SpectacularRedocView", url_name="schema"),
         name="redoc",
     ),
 ]
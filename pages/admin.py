@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.contrib import admin
 from django.http import JsonResponse
+from django.template.response import TemplateResponse
 from django.urls import path
 
 from .forms import PageContentInlineForm, get_allowed_content_models
 from .models import AudioContent, Page, PageContent, VideoContent
+from .profiling import slow_requests
 
 
 class PageContentInline(admin.TabularInline):
@@ -26,10 +29,31 @@ class PageAdmin(admin.ModelAdmin):
                 "content-autocomplete/",
                 self.admin_site.admin_view(self.content_autocomplete),
                 name="pages_page_content_autocomplete",
-            )
+            ),
+            path(
+                "slow-requests/",
+                self.admin_site.admin_view(self.slow_requests_view),
+                name="pages_page_slow_requests",
+            ),
         ]
         return extra + urls
 
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            "profiler_enabled": getattr(settings, "REQUEST_PROFILER_ENABLED", False),
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def slow_requests_view(self, request):
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Медленные запросы",
+            "opts": self.model._meta,
+            "entries": slow_requests(),
+        }
+        return TemplateResponse(request, "admin/pages/slow_requests.html", context)
+
     def content_autocomplete(self, request):
         term = request.GET.get("term", "").strip()
         page = int(request.GET.get("page") or 1)
@@ -0,0 +1,82 @@
+"""HTTP caching helpers for the pages API.
+
+- ``add_cache_headers`` marks anonymous list/detail responses cacheable by
+  shared caches for ``API_CACHE_MAX_AGE`` seconds and tags them with a
+  ``Surrogate-Key`` (``pages`` for lists, ``page-{id}`` for details).
+- ``invalidate_pages`` drops cached page->contents maps (only kept in the
+  beacon and log impression modes) and, when
+  ``API_CACHE_PURGE_ENDPOINTS`` is set, schedules ``purge_page_cache`` after
+  commit to refresh the affected URLs in nginx.
+- ``page_content_ids`` is the cached page->contents map used by the
+  impression beacon, so counting a cache-served view costs no SQL.
+"""
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .models import PageContent
+
+logger = logging.getLogger(__name__)
+# Impression sources that read page->contents maps through page_content_ids
+CONTENT_MAP_SOURCES = ("beacon", "log")
+
+
+def _contents_key(page_id: int) -> str:
+    return f"pages:contents:{page_id}"
+
+
+def add_cache_headers(request, response, surrogate_keys: list[str]):
+    max_age = int(getattr(settings, "API_CACHE_MAX_AGE", 0))
+    if max_age <= 0:
+        return response
+    anonymous = "HTTP_AUTHORIZATION" not in request.META and not (
+        request.user and request.user.is_authenticated
+    )
+    if not anonymous:
+        patch_cache_control(response, private=True)
+        return response
+    # Browsers always revalidate; shared caches (nginx) may serve for max_age
+    patch_cache_control(response, public=True, max_age=0, s_maxage=max_age)
+    patch_vary_headers(response, ("Accept",))
+    response["Surrogate-Key"] = " ".join(surrogate_keys)
+    return response
+
+
+def page_content_ids(page_id: int) -> dict[str, list[int]]:
+    """Content object ids on ``page_id`` grouped by model label (cached)."""
+    key = _contents_key(page_id)
+    content_ids = cache.get(key)
+    if content_ids is None:
+        grouped: dict[str, list[int]] = defaultdict(list)
+        rows = (
+            PageContent.objects.filter(page_id=page_id)
+            .order_by("id")
+            .values_list("content_type__app_label", "content_type__model", "object_id")
+        )
+        for app_label, model, object_id in rows:
+            grouped[f"{app_label}.{model}"].append(object_id)
+        content_ids = dict(grouped)
+        cache.set(
+            key, content_ids, int(getattr(settings, "PAGE_CONTENTS_CACHE_TTL", 300))
+        )
+    return content_ids
+
+
+def invalidate_pages(page_ids) -> None:
+    page_ids = sorted(set(page_ids))
+    if not page_ids:
+        return
+    if getattr(settings, "IMPRESSIONS_SOURCE", "request") in CONTENT_MAP_SOURCES:
+        try:
+            cache.delete_many([_contents_key(pk) for pk in page_ids])
+        except Exception as exc:  # a cache outage must not fail the write
+            logger.warning("Dropping page->contents maps failed: %s", exc)
+    if getattr(settings, "API_CACHE_PURGE_ENDPOINTS", None):
+        from .tasks import purge_page_cache
+
+        transaction.on_commit(lambda: purge_page_cache.delay(page_ids))
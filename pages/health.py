@@ -0,0 +1,136 @@
+"""Readiness probe for load balancers and orchestrators.
+
+Unlike ``health`` (process is up), ``readiness`` checks that the DB, the
+Celery broker and the counters Redis answer within
+``READINESS_PROBE_TIMEOUT`` seconds. Results are cached per process for
+``READINESS_CACHE_TTL`` seconds so frequent polling cannot turn into load
+on the dependencies themselves.
+"""
+
+import math
+import threading
+import time
+
+import redis
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse
+
+from .tasks import _counter_key, _flush_keys_key, _label_set_key
+
+_LOCK = threading.Lock()
+_CACHE: dict = {"at": 0.0, "result": None}
+_COUNTER_REDIS = None
+
+
+def _timeout() -> float:
+    return float(getattr(settings, "READINESS_PROBE_TIMEOUT", 0.5))
+
+
+def _counter_redis() -> redis.Redis:
+    # Separate client from tasks._redis_client so the tight timeouts apply only
+    # to probes, metrics scrapes and the profiler, never to flushes
+    global _COUNTER_REDIS
+    if _COUNTER_REDIS is None:
+        url = getattr(settings, "COUNTER_REDIS_URL", None) or getattr(
+            settings, "CELERY_BROKER_URL", "redis://localhost:6379/1"
+        )
+        _COUNTER_REDIS = redis.Redis.from_url(
+            url, socket_timeout=_timeout(), socket_connect_timeout=_timeout()
+        )
+    return _COUNTER_REDIS
+
+
+def _probe_db() -> None:
+    if connection.vendor != "postgresql":
+        with connection.cursor() as cur:
+            cur.execute("SELECT 1")
+        return
+    # A fresh connection with connect_timeout: Django's own connects without
+    # one, and an unreachable DB would otherwise hang here with _LOCK held
+    conn = connection.Database.connect(
+        **{
+            **connection.get_connection_params(),
+            "connect_timeout": max(1, math.ceil(_timeout())),
+            "options": f"-c statement_timeout={int(_timeout() * 1000)}",
+        }
+    )
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+    finally:
+        conn.close()
+
+
+def _probe_broker() -> None:
+    from config.celery import app
+
+    timeout = _timeout()
+    with app.connection_for_write(
+        connect_timeout=timeout,
+        transport_options={
+            "socket_timeout": timeout,
+            "socket_connect_timeout": timeout,
+        },
+    ) as conn:
+        # connect() retries once after a fixed 2 s pause, with _LOCK held
+        conn.ensure_connection(max_retries=0)
+
+
+def _probe_counter_redis() -> None:
+    _counter_redis().ping()
+
+
+PROBES = {
+    "db": _probe_db,
+    "broker": _probe_broker,
+    "counter_redis": _probe_counter_redis,
+}
+
+
+def _flush_backlog() -> dict:
+    """Pending ids across counter hashes plus temp keys not yet flushed."""
+    r = _counter_redis()
+    labels = sorted(raw.decode() for raw in r.smembers(_label_set_key()))
+    pipe = r.pipeline(transaction=False)
+    for label in labels:
+        pipe.hlen(_counter_key(label))
+    pending = sum(pipe.execute()) if labels else 0
+    flush_keys = r.scard(_flush_keys_key())
+    return {"pending_ids": pending, "flush_keys": flush_keys}
+
+
+def _run_probes() -> dict:
+    checks = {}
+    for name, probe in PROBES.items():
+        start = time.perf_counter()
+        try:
+            probe()
+            check = {"ok": True}
+        except Exception as exc:
+            check = {"ok": False, "error": exc.__class__.__name__}
+        check["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        checks[name] = check
+
+    result = {"checks": checks}
+    if checks["counter_redis"]["ok"]:
+        try:
+            result["backlog"] = _flush_backlog()
+        except redis.exceptions.RedisError:
+            result["backlog"] = None
+    result["status"] = "ok" if all(c["ok"] for c in checks.values()) else "fail"
+    return result
+
+
+def readiness(_request):
+    ttl = float(getattr(settings, "READINESS_CACHE_TTL", 2.0))
+    with _LOCK:
+        now = time.monotonic()
+        cached = _CACHE["result"] is not None and now - _CACHE["at"] < ttl
+        if not cached:
+            _CACHE["result"] = _run_probes()
+            _CACHE["at"] = now
+        result = _CACHE["result"]
+    return JsonResponse(
+        {**result, "cached": cached}, status=200 if result["status"] == "ok" else 503
+    )
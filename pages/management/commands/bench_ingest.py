@@ -0,0 +1,125 @@
+import random
+import time
+
+import redis
+from celery import Task
+from celery_batches import SimpleRequest
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from kombu.utils.uuid import uuid
+
+from pages import tasks
+from pages.serializers import CONTENT_TYPE_MODELS
+
+
+def _request(task, args: tuple) -> SimpleRequest:
+    return SimpleRequest(
+        id=uuid(),
+        name=task.name,
+        args=args,
+        kwargs={},
+        delivery_info={},
+        hostname="bench",
+        ignore_result=True,
+        reply_to=None,
+        correlation_id=None,
+        request_dict={},
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker CPU per impression for ingest_impressions, executed "
+        "one message per task run (unbatched) versus worker-side batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--redis-url",
+            default="redis://redis:6379/15",
+            help="Scratch Redis DB for the run; its bench keys are deleted after.",
+        )
+        parser.add_argument("--messages", type=int, default=20000)
+        parser.add_argument(
+            "--ids-per-message",
+            type=int,
+            default=3,
+            help="Content ids per message, as sent by one page view (default: 3).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "COUNTER_INGEST_BATCH_SIZE", 500),
+            help="Messages per batched execution (default: COUNTER_INGEST_BATCH_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        if options["redis_url"] == getattr(settings, "COUNTER_REDIS_URL", None):
+            raise CommandError("Refusing to benchmark against the live counter Redis.")
+        if getattr(settings, "CELERY_TASK_ALWAYS_EAGER", False):
+            raise CommandError("Eager mode writes to the DB; run without it.")
+
+        task = tasks.ingest_impressions
+        labels = [m._meta.label_lower for m in CONTENT_TYPE_MODELS.values()]
+        rng = random.Random(0)
+        messages = [
+            (
+                rng.choice(labels),
+                rng.sample(range(1, 100_000), options["ids_per_message"]),
+            )
+            for _ in range(options["messages"])
+        ]
+        impressions = len(messages) * options["ids_per_message"]
+        batch_size = max(1, options["batch_size"])
+
+        saved, tasks._REDIS = tasks._REDIS, redis.Redis.from_url(options["redis_url"])
+        try:
+            tasks._REDIS.ping()
+            # Unbatched: what a plain task pays per message (trace + Redis trips)
+            unbatched = self.measure(lambda: [task.apply(args=m) for m in messages])
+            self.cleanup(labels)
+            requests = [_request(task, m) for m in messages]
+            batched = self.measure(
+                lambda: [
+                    Task.apply(task, (requests[i : i + batch_size],))
+                    for i in range(0, len(requests), batch_size)
+                ]
+            )
+        except redis.exceptions.RedisError as exc:
+            raise CommandError(f"Redis unavailable: {exc}")
+        finally:
+            self.cleanup(labels)
+            tasks._REDIS = saved
+
+        self.stdout.write(
+            f"{len(messages):,} messages, {impressions:,} impressions, "
+            f"batch size {batch_size}\n"
+            f"{'mode':<11}{'cpu s':>8}{'wall s':>8}{'cpu us/impr':>13}{'msgs/s':>10}"
+        )
+        for name, (cpu, wall) in (("unbatched", unbatched), ("batched", batched)):
+            self.stdout.write(
+                f"{name:<11}{cpu:>8.2f}{wall:>8.2f}"
+                f"{cpu / impressions * 1e6:>13.1f}{len(messages) / wall:>10,.0f}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Batching cuts worker CPU per impression {unbatched[0] / batched[0]:.1f}x "
+                "(broker receive/ack, paid per message either way, is not included)."
+            )
+        )
+
+    @staticmethod
+    def measure(run) -> tuple[float, float]:
+        cpu, wall = time.process_time(), time.perf_counter()
+        run()
+        return max(time.process_time() - cpu, 1e-9), time.perf_counter() - wall
+
+    @staticmethod
+    def cleanup(labels: list[str]) -> None:
+        r = tasks._REDIS
+        keys = [tasks._counter_key(label) for label in labels] + [
+            tasks._label_set_key()
+        ]
+        keys += list(r.scan_iter(match=tasks._dedup_key("*"), count=1000))
+        for i in range(0, len(keys), 1000):
+            r.delete(*keys[i : i + 1000])
@@ -0,0 +1,173 @@
+import random
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pages.models import Page, PageContent
+from pages.serializers import CONTENT_TYPE_MODELS
+
+WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+    "mike november oscar papa quebec romeo sierra tango uniform victor"
+).split()
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """``"video=3,audio=1"`` -> ``{"video": 3.0, "audio": 1.0}``."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in CONTENT_TYPE_MODELS:
+            raise CommandError(f"Unknown content type in --mix: {name!r}")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Bad weight in --mix: {part!r}")
+    if not any(mix.values()):
+        raise CommandError("--mix needs at least one positive weight.")
+    return mix
+
+
+def contents_per_page(rng: random.Random, distribution: str, low: int, high: int):
+    """Draw how many content items a page gets."""
+    if distribution == "fixed":
+        return high
+    if distribution == "pareto":
+        # Heavy tail: most pages are small, a few sit at the maximum
+        return min(high, low + int(rng.paretovariate(1.5)) - 1)
+    return rng.randint(low, high)
+
+
+def title(rng: random.Random, prefix: str, n) -> str:
+    return f"{prefix} {n} {rng.choice(WORDS)} {rng.choice(WORDS)}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic pages with video/audio content using bulk inserts, "
+        "for load testing and query plan checks at production scale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=1000, help="Pages to create.")
+        parser.add_argument(
+            "--contents",
+            default="1-10",
+            help="Content items per page as MIN-MAX or N (default: 1-10).",
+        )
+        parser.add_argument(
+            "--distribution",
+            choices=["uniform", "pareto", "fixed"],
+            default="uniform",
+            help="How counts are drawn from --contents (fixed uses MAX).",
+        )
+        parser.add_argument(
+            "--mix",
+            default="video=1,audio=1",
+            help="Relative weights of content types (default: video=1,audio=1).",
+        )
+        parser.add_argument(
+            "--max-counter",
+            type=int,
+            default=0,
+            help="Randomise counters in [0, N] (default: 0).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Pages per transaction (default: 1000).",
+        )
+        parser.add_argument("--seed", type=int, help="Random seed for repeatable data.")
+
+    def handle(self, *args, **options):
+        low, _, high = options["contents"].partition("-")
+        try:
+            low, high = int(low), int(high or low)
+        except ValueError:
+            raise CommandError("--contents must be MIN-MAX or N.")
+        if not 0 <= low <= high:
+            raise CommandError("--contents needs 0 <= MIN <= MAX.")
+        mix = parse_mix(options["mix"])
+        self.types = list(mix)
+        self.weights = list(mix.values())
+        self.rng = random.Random(options["seed"])
+        self.content_types = ContentType.objects.get_for_models(
+            *CONTENT_TYPE_MODELS.values()
+        )
+        self.low, self.high = low, high
+        self.distribution = options["distribution"]
+        self.max_counter = options["max_counter"]
+        first_page = (
+            Page.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+        ) + 1
+
+        total, batch_size = options["pages"], options["batch_size"]
+        created = {"pages": 0, "contents": 0}
+        start = time.monotonic()
+        for offset in range(0, total, batch_size):
+            count = min(batch_size, total - offset)
+            with transaction.atomic():
+                contents = self.create_batch(first_page + offset, count)
+            created["pages"] += count
+            created["contents"] += contents
+            rate = created["pages"] / (time.monotonic() - start)
+            self.stdout.write(
+                f"{created['pages']:,}/{total:,} pages, {created['contents']:,} "
+                f"content items ({rate:,.0f} pages/s)"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created['pages']:,} pages and {created['contents']:,} "
+                f"content items in {time.monotonic() - start:.1f}s."
+            )
+        )
+
+    def create_batch(self, number: int, count: int) -> int:
+        rng = self.rng
+        pages = Page.objects.bulk_create(
+            [Page(title=title(rng, "Page", number + i)) for i in range(count)]
+        )
+        # (page, type) per slot, then one bulk insert per content model
+        slots = []
+        for page in pages:
+            n = contents_per_page(rng, self.distribution, self.low, self.high)
+            slots += [(page, t) for t in rng.choices(self.types, self.weights, k=n)]
+        objects = {name: [] for name in self.types}
+        for i, (page, name) in enumerate(slots):
+            objects[name].append(self.build(name, f"{page.pk}.{i}"))
+        for name, objs in objects.items():
+            if objs:
+                CONTENT_TYPE_MODELS[name].objects.bulk_create(objs)
+
+        # Links keep each page's draw order, which is also API order
+        cursors = {name: iter(objs) for name, objs in objects.items()}
+        PageContent.objects.bulk_create(
+            [
+                PageContent(
+                    page=page,
+                    content_type=self.content_types[CONTENT_TYPE_MODELS[name]],
+                    object_id=next(cursors[name]).pk,
+                )
+                for page, name in slots
+            ]
+        )
+        return len(slots)
+
+    def build(self, name: str, ref: str):
+        rng = self.rng
+        model = CONTENT_TYPE_MODELS[name]
+        fields = {
+            "title": title(rng, name.title(), ref),
+            "counter": rng.randint(0, self.max_counter),
+        }
+        if name == "video":
+            fields["file_url"] = f"https://cdn.example.com/video/{ref}.mp4"
+            if rng.random() < 0.5:
+                fields["subtitles_url"] = f"https://cdn.example.com/video/{ref}.vtt"
+        elif name == "audio":
+            fields["text"] = " ".join(rng.choices(WORDS, k=rng.randint(20, 200)))
+        return model(**fields)
@@ -0,0 +1,299 @@
+import csv
+import io
+import json
+import sys
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+
+from pages.models import Page, PageContent
+from pages.serializers import CONTENT_TYPE_MODELS
+from pages.signals import touch_pages
+
+TYPE_MODELS = {"page": Page, **CONTENT_TYPE_MODELS}
+# Never taken from input: pk, key, live view counters and bookkeeping
+SKIP_FIELDS = {"id", "external_id", "counter", "updated_at"}
+
+
+def import_fields(model) -> list[str]:
+    return [
+        f.name
+        for f in model._meta.concrete_fields
+        if f.name not in SKIP_FIELDS and not f.is_relation
+    ]
+
+
+def read_records(path: str, fmt: str):
+    """Yield ``(line_no, record)`` pairs lazily from a JSONL or CSV file.
+
+    CSV uses the same column names as JSONL keys; ``pages`` holds page
+    external ids separated by ``|``.
+    """
+    fh = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+    try:
+        if fmt == "csv":
+            for line_no, row in enumerate(csv.DictReader(fh), start=2):
+                record = {k: v for k, v in row.items() if k and v is not None}
+                if record.get("pages"):
+                    record["pages"] = record["pages"].split("|")
+                yield line_no, record
+        else:
+            for line_no, line in enumerate(fh, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f"Line {line_no}: {exc}")
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+def record_errors(model, values: dict) -> list[str]:
+    """Problems the database would reject ``values`` for, as messages."""
+    errors = []
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if value is None:
+            if not field.null:
+                errors.append(f"{name} may not be null")
+        elif field.max_length and len(str(value)) > field.max_length:
+            errors.append(f"{name} is longer than {field.max_length} characters")
+    return errors
+
+
+def copy_upsert_sql(model, fields) -> tuple[str, str, str, str]:
+    """PostgreSQL statements for the ``--copy`` path: staging table, COPY,
+    upsert into ``model``'s table and staging cleanup.
+
+    The staging table holds only the copied columns, so the target's NOT NULL
+    columns that are not imported (``id``, ``counter``) do not apply to it.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    staging = qn(f"import_{model._meta.db_table}")
+    cols = ", ".join(qn(f.column) for f in fields)
+    # ``counter`` has no DB default; new rows start at 0, updates keep it
+    extra_cols, extra_vals = ("", "")
+    if any(f.name == "counter" for f in model._meta.concrete_fields):
+        extra_cols, extra_vals = (f", {qn('counter')}", ", 0")
+    updates = ", ".join(
+        f"{qn(f.column)} = EXCLUDED.{qn(f.column)}"
+        for f in fields
+        if f.name != "external_id"
+    )
+    return (
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+        f"SELECT {cols} FROM {table} WITH NO DATA",
+        f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv)",
+        f"INSERT INTO {table} ({cols}{extra_cols}) "
+        f"SELECT {cols}{extra_vals} FROM {staging} "
+        f"ON CONFLICT ({qn('external_id')}) DO UPDATE SET {updates}",
+        f"TRUNCATE {staging}",
+    )
+
+
+def batched(iterable, size: int):
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream pages, video and audio content from JSONL/CSV and upsert them "
+        "by external_id in batches, linking content to pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "csv"],
+            help="Input format (default: from the file extension, else jsonl).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Records per transaction (default: 2000).",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="On PostgreSQL load rows with COPY into a staging table.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "jsonl")
+        self.use_copy = options["copy"] and connection.vendor == "postgresql"
+        if options["copy"] and not self.use_copy:
+            self.stderr.write(self.style.WARNING("--copy needs PostgreSQL; ignored."))
+        self.content_types = {
+            model: ct.pk
+            for model, ct in ContentType.objects.get_for_models(
+                *CONTENT_TYPE_MODELS.values()
+            ).items()
+        }
+        self.verbosity = options["verbosity"]
+        self.stats = defaultdict(int)
+
+        start = time.monotonic()
+        try:
+            for batch in batched(read_records(path, fmt), options["batch_size"]):
+                try:
+                    with transaction.atomic():
+                        self.import_batch(batch)
+                except DatabaseError as exc:
+                    raise CommandError(
+                        f"Lines {batch[0][0]}-{batch[-1][0]} rolled back: {exc}"
+                    )
+                elapsed = time.monotonic() - start
+                self.stdout.write(
+                    f"{self.stats['records']:,} records, {self.stats['links']:,} "
+                    f"new links ({self.stats['records'] / elapsed:,.0f} records/s)"
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        summary = (
+            f"Imported {self.stats['records']:,} records and "
+            f"{self.stats['links']:,} page links in {time.monotonic() - start:.1f}s."
+        )
+        self.stdout.write(self.style.SUCCESS(summary))
+        for key, what in (
+            ("invalid", "invalid records skipped"),
+            ("unresolved", "links to unknown pages skipped"),
+        ):
+            if self.stats[key]:
+                self.stderr.write(self.style.WARNING(f"{self.stats[key]:,} {what}."))
+
+    def import_batch(self, batch) -> None:
+        rows: dict = defaultdict(dict)  # model -> {external_id: values}
+        links: list[tuple] = []  # (model, external_id, page external_id)
+        for line_no, record in batch:
+            if not isinstance(record, dict):
+                record = {}
+            model = TYPE_MODELS.get(record.get("type"))
+            key = record.get("external_id")
+            if model is None or key in (None, ""):
+                self.skip(line_no, "needs a known type and external_id")
+                continue
+            key = str(key)
+            values = {
+                name: record[name] for name in import_fields(model) if name in record
+            }
+            errors = record_errors(model, {"external_id": key, **values})
+            if errors:
+                self.skip(line_no, "; ".join(errors))
+                continue
+            rows[model][key] = values
+            if model is not Page:
+                links.extend(
+                    (model, key, str(page)) for page in record.get("pages", [])
+                )
+            self.stats["records"] += 1
+
+        # Pages first so content in the same batch can link to them
+        self.upsert(Page, rows.pop(Page, {}))
+        ids = {
+            model: self.upsert(model, model_rows) for model, model_rows in rows.items()
+        }
+        self.link(links, ids)
+        # bulk writes skip signals: bump pages showing any content touched here
+        for model, model_ids in ids.items():
+            if model_ids:
+                touch_pages(
+                    contents__content_type_id=self.content_types[model],
+                    contents__object_id__in=list(model_ids.values()),
+                )
+
+    def skip(self, line_no: int, reason: str) -> None:
+        self.stats["invalid"] += 1
+        if self.verbosity >= 2:
+            self.stderr.write(f"Line {line_no}: {reason}")
+
+    def upsert(self, model, rows: dict) -> dict[str, int]:
+        """Insert or update ``rows`` by external_id; return external_id -> pk."""
+        if not rows:
+            return {}
+        objs = [model(external_id=key, **values) for key, values in rows.items()]
+        update_fields = import_fields(model)
+        if model is Page:
+            update_fields.append("updated_at")
+        if self.use_copy:
+            self.copy_upsert(model, objs, update_fields)
+        else:
+            model.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["external_id"],
+                update_fields=update_fields,
+            )
+        return dict(
+            model.objects.filter(external_id__in=list(rows)).values_list(
+                "external_id", "pk"
+            )
+        )
+
+    def copy_upsert(self, model, objs, update_fields: list[str]) -> None:
+        fields = [
+            model._meta.get_field(name) for name in ["external_id", *update_fields]
+        ]
+        buf = io.StringIO()
+        writer = csv.writer(buf, quoting=csv.QUOTE_ALL)
+        for obj in objs:
+            writer.writerow(
+                [f.get_db_prep_save(f.pre_save(obj, True), connection) for f in fields]
+            )
+        buf.seek(0)
+
+        create_sql, copy_sql, upsert_sql, truncate_sql = copy_upsert_sql(model, fields)
+        with connection.cursor() as cur:
+            cur.execute(create_sql)
+            raw = cur.cursor
+            if hasattr(raw, "copy_expert"):  # psycopg2
+                raw.copy_expert(copy_sql, buf)
+            else:  # psycopg 3
+                with raw.copy(copy_sql) as copy:
+                    copy.write(buf.getvalue())
+            cur.execute(upsert_sql)
+            cur.execute(truncate_sql)
+
+    def link(self, links: list[tuple], ids: dict) -> None:
+        if not links:
+            return
+        page_ids = dict(
+            Page.objects.filter(
+                external_id__in={page for _, _, page in links}
+            ).values_list("external_id", "pk")
+        )
+        wanted = {}
+        for model, key, page in links:
+            if page not in page_ids or key not in ids.get(model, {}):
+                self.stats["unresolved"] += 1
+                continue
+            triple = (page_ids[page], self.content_types[model], ids[model][key])
+            wanted.setdefault(triple, None)
+        if not wanted:
+            return
+        existing = set(
+            PageContent.objects.filter(
+                page_id__in={p for p, _, _ in wanted},
+                content_type_id__in={c for _, c, _ in wanted},
+                object_id__in={o for _, _, o in wanted},
+            ).values_list("page_id", "content_type_id", "object_id")
+        )
+        new = [
+            PageContent(page_id=p, content_type_id=c, object_id=o)
+            for p, c, o in wanted
+            if (p, c, o) not in existing
+        ]
+        PageContent.objects.bulk_create(new)
+        self.stats["links"] += len(new)
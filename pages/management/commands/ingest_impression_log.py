@@ -0,0 +1,292 @@
+import json
+import os
+import re
+import signal
+import socket
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.caching import page_content_ids
+from pages.tasks import _redis_client, incr_counters
+
+# Matches the "impressions" log_format in nginx/nginx.conf
+# ("$status $request_method $detail_page_id"), optionally behind a syslog
+# header when nginx logs over UDP/unix sockets.
+LINE_RE = re.compile(r"(?P<status>\d{3}) (?P<method>[A-Z]+) (?P<page_id>\d+)\s*$")
+COUNTED_STATUSES = {"200", "304"}
+POLL_INTERVAL = 0.2  # seconds
+MAX_CACHED_MAPS = 100_000
+
+
+def parse_page_id(line: str) -> int | None:
+    """Page id of a counted detail view in ``line``, or ``None``."""
+    match = LINE_RE.search(line)
+    if (
+        match is None
+        or match["method"] != "GET"
+        or match["status"] not in COUNTED_STATUSES
+    ):
+        return None
+    return int(match["page_id"])
+
+
+class FollowFile:
+    """Iterate lines appended to ``path`` like ``tail -F``; ``None`` when idle.
+
+    Survives rotation (the path now points at a new inode; lines still
+    written to the old file are read first) and truncation (copytruncate).
+    With ``once`` stops at the current end of file.
+
+    ``position`` is ``(inode, offset)`` just past the last line returned.
+    Passing it back as ``resume`` continues from there after a restart; if
+    the file was rotated in between, the new file is read from the start.
+    """
+
+    def __init__(self, path: str, from_start=False, once=False, resume=None):
+        self.path = path
+        self.once = once
+        self.fh = open(path, "rb")
+        st = os.fstat(self.fh.fileno())
+        if resume is not None:
+            inode, offset = resume
+            if inode == st.st_ino and offset <= st.st_size:
+                self.fh.seek(offset)
+        elif not from_start:
+            self.fh.seek(0, os.SEEK_END)
+        self.position = (st.st_ino, self.fh.tell())
+        self.lines = self.follow()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.lines)
+
+    def close(self) -> None:
+        self.lines.close()
+
+    def read_line(self) -> str | None:
+        """Next complete line, or ``None`` at the end of the file."""
+        line = self.fh.readline()
+        if not line.endswith(b"\n") and not (line and self.once):
+            # nginx may be mid-write: leave the partial line for later
+            self.fh.seek(-len(line), os.SEEK_CUR)
+            return None
+        self.position = (self.position[0], self.fh.tell())
+        return line.decode("utf-8", errors="replace")
+
+    def reopen(self) -> None:
+        self.fh.close()
+        self.fh = open(self.path, "rb")
+        self.position = (os.fstat(self.fh.fileno()).st_ino, 0)
+
+    def follow(self):
+        try:
+            while True:
+                line = self.read_line()
+                if line is not None:
+                    yield line
+                    continue
+                if self.once:
+                    return
+                yield None
+                time.sleep(POLL_INTERVAL)
+                try:
+                    st = os.stat(self.path)
+                except FileNotFoundError:
+                    continue
+                rotated = st.st_ino != os.fstat(self.fh.fileno()).st_ino
+                if rotated or st.st_size < self.fh.tell():
+                    if rotated:
+                        # nginx keeps writing the old file until it reopens logs
+                        while (line := self.read_line()) is not None:
+                            yield line
+                    self.reopen()
+        finally:
+            self.fh.close()
+
+
+def read_socket(sock: socket.socket):
+    """Yield lines from datagrams on ``sock``; ``None`` when idle."""
+    sock.settimeout(POLL_INTERVAL)
+    while True:
+        try:
+            data = sock.recv(65535)
+        except socket.timeout:
+            yield None
+            continue
+        yield from data.decode("utf-8", errors="replace").splitlines()
+
+
+class Command(BaseCommand):
+    help = (
+        "Count page views from nginx's impressions log (file, UDP or unix "
+        "datagram socket) straight into the views:counter:{label} hashes."
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--file", help="Log file to follow (tail -F).")
+        source.add_argument("--udp", help="host:port to receive syslog datagrams on.")
+        source.add_argument("--unix", help="Unix datagram socket path to bind.")
+        parser.add_argument(
+            "--from-start",
+            action="store_true",
+            help="Read --file from the beginning instead of its end.",
+        )
+        parser.add_argument(
+            "--state",
+            help=(
+                "File keeping the --file position (inode, offset) after every "
+                "flush; a restart resumes from it instead of the end of file."
+            ),
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop at the end of --file instead of following it.",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            type=float,
+            default=1.0,
+            help="Seconds between Redis flushes (default: 1.0).",
+        )
+        parser.add_argument(
+            "--max-pending",
+            type=int,
+            default=10000,
+            help="Flush early once this many views are buffered (default: 10000).",
+        )
+        parser.add_argument(
+            "--map-ttl",
+            type=float,
+            default=30.0,
+            help="Seconds to keep page->contents maps in process (default: 30).",
+        )
+
+    def handle(self, *args, **options):
+        if getattr(settings, "IMPRESSIONS_SOURCE", "request") != "log":
+            self.stderr.write(
+                self.style.WARNING(
+                    "IMPRESSIONS_SOURCE is not 'log': views may be counted twice."
+                )
+            )
+        self.verbosity = options["verbosity"]
+        self.map_ttl = options["map_ttl"]
+        self.maps: dict[int, tuple[float, dict[str, list[int]]]] = {}
+        self.totals = Counter()
+        self.state_path = options["state"]
+        self.follower = None
+        self.stopping = False
+
+        sock = None
+        if options["file"]:
+            lines = self.follower = FollowFile(
+                options["file"],
+                options["from_start"],
+                options["once"],
+                resume=self.load_position(),
+            )
+        elif options["udp"]:
+            host, _, port = options["udp"].rpartition(":")
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((host or "0.0.0.0", int(port)))
+            lines = read_socket(sock)
+        else:
+            if os.path.exists(options["unix"]):
+                os.unlink(options["unix"])
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(options["unix"])
+            lines = read_socket(sock)
+
+        # docker stop / compose restart: finish the loop and flush the buffer
+        previous_handler = signal.signal(signal.SIGTERM, self.stop)
+        try:
+            self.consume(lines, options["flush_interval"], options["max_pending"])
+        except KeyboardInterrupt:
+            pass
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            lines.close()
+            if sock is not None:
+                sock.close()
+        self.stdout.write(
+            f"Ingested {self.totals['views']} page views "
+            f"({self.totals['impressions']} content impressions)."
+        )
+
+    def consume(self, lines, flush_interval: float, max_pending: int) -> None:
+        pending: Counter = Counter()
+        buffered = 0
+        deadline = time.monotonic() + flush_interval
+        try:
+            for line in lines:
+                page_id = parse_page_id(line) if line else None
+                if page_id is not None:
+                    pending[page_id] += 1
+                    buffered += 1
+                now = time.monotonic()
+                if buffered and (now >= deadline or buffered >= max_pending):
+                    self.flush(pending)
+                    pending = Counter()
+                    buffered = 0
+                if now >= deadline:
+                    deadline = now + flush_interval
+                if self.stopping:
+                    break
+        finally:
+            if pending:
+                self.flush(pending)
+
+    def flush(self, page_views: Counter) -> None:
+        counts: dict[str, dict[int, int]] = defaultdict(Counter)
+        for page_id, views in page_views.items():
+            for label, ids in self.content_ids(page_id).items():
+                for object_id in set(ids):
+                    counts[label][object_id] += views
+        if counts:
+            incr_counters(_redis_client(), counts)
+        self.save_position()
+        self.totals["views"] += sum(page_views.values())
+        self.totals["impressions"] += sum(sum(c.values()) for c in counts.values())
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f"Flushed {sum(page_views.values())} views of {len(page_views)} pages."
+            )
+
+    def stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def load_position(self) -> tuple[int, int] | None:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as fh:
+            state = json.load(fh)
+        return state["inode"], state["offset"]
+
+    def save_position(self) -> None:
+        if not self.state_path or self.follower is None:
+            return
+        inode, offset = self.follower.position
+        tmp = f"{self.state_path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump({"inode": inode, "offset": offset}, fh)
+        os.replace(tmp, self.state_path)
+
+    def content_ids(self, page_id: int) -> dict[str, list[int]]:
+        # In-process layer over the shared cache: a hot page costs one
+        # lookup per --map-ttl instead of one per flush.
+        now = time.monotonic()
+        cached = self.maps.get(page_id)
+        if cached is None or cached[0] <= now:
+            if len(self.maps) >= MAX_CACHED_MAPS:
+                self.maps.clear()
+            cached = (now + self.map_ttl, page_content_ids(page_id))
+            self.maps[page_id] = cached
+        return cached[1]
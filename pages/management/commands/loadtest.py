@@ -0,0 +1,271 @@
+import asyncio
+import json
+import random
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.cookiejar import CookieJar
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Set by RequestProfilerMiddleware: db;dur=1.2;desc="3 queries"
+QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+ENDPOINTS = ("list", "detail", "autocomplete")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1)))
+    )
+    return sorted_values[index]
+
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams."""
+
+    def __init__(self, base: urllib.parse.SplitResult, headers: dict[str, str]):
+        self.host = base.hostname
+        self.port = base.port or (443 if base.scheme == "https" else 80)
+        self.ssl = base.scheme == "https"
+        self.headers = {"Host": base.netloc, "Connection": "keep-alive", **headers}
+        self.reader = self.writer = None
+
+    async def get(
+        self, path: str, headers: dict[str, str] | None = None
+    ) -> tuple[int, dict[str, str], bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port, ssl=self.ssl or None
+            )
+        head = "".join(
+            f"{k}: {v}\r\n" for k, v in {**self.headers, **(headers or {})}.items()
+        )
+        self.writer.write(f"GET {path} HTTP/1.1\r\n{head}\r\n".encode())
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            body = b""
+            while size := int((await self.reader.readline()).strip(), 16):
+                body += await self.reader.readexactly(size)
+                await self.reader.readline()
+            await self.reader.readline()
+        else:
+            body = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection") == "close":
+            await self.close()
+        return status, headers, body
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the page list, page detail and admin content autocomplete "
+        "endpoints; reports throughput, latency percentiles and, when "
+        "REQUEST_PROFILER_ENABLED is on, SQL queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://localhost",
+            help="Base URL of the site (default: http://localhost).",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30.0, help="Seconds to run (default: 30)."
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Concurrent keep-alive connections (default: 20).",
+        )
+        parser.add_argument(
+            "--mix",
+            default="list=2,detail=7,autocomplete=1",
+            help="Relative request weights (default: list=2,detail=7,autocomplete=1).",
+        )
+        parser.add_argument(
+            "--sample-pages",
+            type=int,
+            default=20,
+            help="List pages to read page ids and titles from (default: 20).",
+        )
+        parser.add_argument("--admin-user", help="Staff user for the autocomplete.")
+        parser.add_argument("--admin-password", default="")
+        parser.add_argument(
+            "--token", help="Send 'Authorization: Token ...' (bypasses caches)."
+        )
+
+    def handle(self, *args, **options):
+        base = urllib.parse.urlsplit(options["url"].rstrip("/"))
+        weights = {}
+        for part in options["mix"].split(","):
+            name, _, weight = part.partition("=")
+            if name not in ENDPOINTS:
+                raise CommandError(f"Unknown endpoint in --mix: {name!r}")
+            weights[name] = float(weight or 1)
+
+        headers = {"Accept": "application/json"}
+        # Only autocomplete gets the admin session: a sessionid on list/detail
+        # would bypass the nginx cache and measure the wrong path
+        self.endpoint_headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        if weights.get("autocomplete"):
+            if not options["admin_user"]:
+                self.stderr.write("No --admin-user: skipping autocomplete.")
+                weights["autocomplete"] = 0
+            else:
+                self.endpoint_headers["autocomplete"] = {
+                    "Cookie": self.admin_login(
+                        options["url"], options["admin_user"], options["admin_password"]
+                    )
+                }
+
+        self.page_ids, self.terms = self.sample(options["url"], options["sample_pages"])
+        if not self.page_ids:
+            raise CommandError("No pages found; run generate_content first.")
+        self.stdout.write(
+            f"Sampled {len(self.page_ids)} page ids; running {options['duration']}s "
+            f"with {options['concurrency']} connections against {options['url']}"
+        )
+
+        self.samples = {name: [] for name in ENDPOINTS}  # (latency, queries)
+        self.errors = {name: 0 for name in ENDPOINTS}
+        names = [n for n in ENDPOINTS if weights.get(n)]
+        started = time.monotonic()
+        asyncio.run(
+            self.run(
+                base,
+                headers,
+                names,
+                [weights[n] for n in names],
+                options["duration"],
+                options["concurrency"],
+            )
+        )
+        self.report(time.monotonic() - started)
+
+    def admin_login(self, url: str, username: str, password: str) -> str:
+        """Log in through the admin form; returns the Cookie header value."""
+        jar = CookieJar()
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+        login_url = f"{url.rstrip('/')}/admin/login/"
+        opener.open(login_url).read()
+        csrf = next((c.value for c in jar if c.name == "csrftoken"), "")
+        data = urllib.parse.urlencode(
+            {
+                "username": username,
+                "password": password,
+                "csrfmiddlewaretoken": csrf,
+                "next": "/admin/",
+            }
+        ).encode()
+        request = urllib.request.Request(
+            login_url, data, headers={"Referer": login_url}
+        )
+        opener.open(request).read()
+        if not any(c.name == "sessionid" for c in jar):
+            raise CommandError(
+                "Admin login failed; check --admin-user/--admin-password."
+            )
+        return "; ".join(f"{c.name}={c.value}" for c in jar)
+
+    def sample(self, url: str, pages: int) -> tuple[list[int], list[str]]:
+        ids, terms = [], set()
+        self.list_pages = 1
+        for number in range(1, pages + 1):
+            try:
+                with urllib.request.urlopen(
+                    f"{url.rstrip('/')}/api/v1/pages/?page={number}"
+                ) as response:
+                    data = json.load(response)
+            except urllib.error.HTTPError:
+                break
+            for page in data["results"]:
+                ids.append(page["id"])
+                terms.update(word[:3].lower() for word in page["title"].split()[2:])
+            self.list_pages = number
+            if not data.get("next"):
+                break
+        return ids, sorted(terms) or [""]
+
+    def path(self, name: str) -> str:
+        if name == "list":
+            return f"/api/v1/pages/?page={random.randint(1, self.list_pages)}"
+        if name == "detail":
+            return f"/api/v1/pages/{random.choice(self.page_ids)}/"
+        term = urllib.parse.quote(random.choice(self.terms))
+        return f"/admin/pages/page/content-autocomplete/?term={term}"
+
+    async def run(self, base, headers, names, weights, duration, concurrency) -> None:
+        deadline = time.monotonic() + duration
+        await asyncio.gather(
+            *(
+                self.worker(Connection(base, headers), names, weights, deadline)
+                for _ in range(concurrency)
+            )
+        )
+
+    async def worker(self, conn: Connection, names, weights, deadline: float) -> None:
+        try:
+            while time.monotonic() < deadline:
+                name = random.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status, headers, _ = await conn.get(
+                        self.path(name), self.endpoint_headers.get(name)
+                    )
+                except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                    self.errors[name] += 1
+                    await conn.close()
+                    continue
+                latency = time.perf_counter() - start
+                if status >= 400:
+                    self.errors[name] += 1
+                    continue
+                match = QUERIES_RE.search(headers.get("server-timing", ""))
+                self.samples[name].append((latency, int(match[1]) if match else None))
+        finally:
+            await conn.close()
+
+    def report(self, elapsed: float) -> None:
+        total = sum(len(s) for s in self.samples.values())
+        self.stdout.write(
+            f"\n{'endpoint':<13}{'reqs':>8}{'err':>6}{'rps':>9}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'q/req':>7}"
+        )
+        for name in ENDPOINTS:
+            samples = self.samples[name]
+            if not samples and not self.errors[name]:
+                continue
+            latencies = sorted(ms * 1000 for ms, _ in samples)
+            queries = [q for _, q in samples if q is not None]
+            q_per_req = f"{sum(queries) / len(queries):.1f}" if queries else "n/a"
+            self.stdout.write(
+                f"{name:<13}{len(samples):>8}{self.errors[name]:>6}"
+                f"{len(samples) / elapsed:>9.1f}"
+                + "".join(f"{percentile(latencies, p):>9.1f}" for p in (50, 90, 99))
+                + f"{(latencies[-1] if latencies else 0):>9.1f}{q_per_req:>7}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Total: {total} requests, {total / elapsed:.1f} req/s")
+        )
+        if all(q is None for s in self.samples.values() for _, q in s):
+            self.stdout.write(
+                "Queries per request need REQUEST_PROFILER_ENABLED=1 on the target "
+                "(read from the Server-Timing header)."
+            )
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP = "import django; django.setup()"
+# What each kind of process imports before it can serve its first job
+TARGETS = {
+    "setup": SETUP,
+    "web": (
+        "from config.wsgi import application; "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    "worker": (
+        f"{SETUP}; from config.celery import app; "
+        "app.loader.import_default_modules()"
+    ),
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """``(module, self_us, cumulative_us)`` rows from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():  # header line
+            continue
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile interpreter start-up with python -X importtime and report the "
+        "slowest modules and packages for the web, worker or bare setup path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=sorted(TARGETS),
+            default="web",
+            help="Start-up path to profile (default: web).",
+        )
+        parser.add_argument(
+            "--top", type=int, default=20, help="Modules to list (default: 20)."
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["cumulative", "self"],
+            default="cumulative",
+            help="Order modules by time including or excluding their imports.",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=3,
+            help="Fresh interpreters to start; the fastest run is reported (default: 3).",
+        )
+
+    def handle(self, *args, **options):
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": os.environ.get(
+                "DJANGO_SETTINGS_MODULE", "config.settings"
+            ),
+        }
+        best = None
+        for _ in range(max(1, options["runs"])):
+            start = time.perf_counter()
+            proc = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", TARGETS[options["target"]]],
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            wall = time.perf_counter() - start
+            if proc.returncode:
+                raise CommandError(proc.stderr.strip().splitlines()[-1])
+            if best is None or wall < best[0]:
+                best = (wall, parse_importtime(proc.stderr))
+        wall, rows = best
+
+        total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+        self.stdout.write(
+            f"{options['target']}: {len(rows)} modules, {total_ms:.0f} ms importing, "
+            f"{wall * 1000:.0f} ms process wall time"
+        )
+
+        key = 2 if options["sort"] == "cumulative" else 1
+        self.stdout.write(f"\n{'cumul ms':>9}{'self ms':>9}  module")
+        slowest = sorted(rows, key=lambda r: -r[key])[: options["top"]]
+        for module, self_us, cumulative_us in slowest:
+            self.stdout.write(
+                f"{cumulative_us / 1000:>9.1f}{self_us / 1000:>9.1f}  {module}"
+            )
+
+        packages = Counter()
+        for module, self_us, _ in rows:
+            packages[module.split(".")[0]] += self_us
+        self.stdout.write(f"\n{'self ms':>9}  top-level package")
+        for package, self_us in packages.most_common(min(options["top"], 10)):
+            self.stdout.write(f"{self_us / 1000:>9.1f}  {package}")
@@ -0,0 +1,186 @@
+"""Prometheus metrics for the API and the impressions pipeline.
+
+Metric objects are module-level so the hot path only does a cached child
+lookup and an in-place increment. When ``PROMETHEUS_MULTIPROC_DIR`` is set
+(gunicorn workers, Celery prefork children) values are written to mmap'ed
+files and aggregated at scrape time by ``metrics_view``.
+"""
+
+import glob
+import os
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float("inf"))
+ROW_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+REQUEST_LATENCY = Histogram(
+    "contenthub_request_duration_seconds",
+    "Request latency by view and action.",
+    ["view", "action"],
+)
+REQUEST_QUERIES = Histogram(
+    "contenthub_request_db_queries",
+    "DB queries executed per request by view and action.",
+    ["view", "action"],
+    buckets=QUERY_BUCKETS,
+)
+INGEST_TASKS = Counter(
+    "contenthub_ingest_tasks_total",
+    "Ingest task messages processed by content label.",
+    ["label"],
+)
+INGEST_IMPRESSIONS = Counter(
+    "contenthub_ingest_impressions_total",
+    "Impressions accepted by ingest_impressions by content label.",
+    ["label"],
+)
+FLUSH_DURATION = Histogram(
+    "contenthub_flush_duration_seconds",
+    "Time spent applying one flush chunk to the DB.",
+    ["label"],
+)
+FLUSH_DROPPED = Counter(
+    "contenthub_flush_dropped_impressions_total",
+    "Impressions lost because a flush chunk kept failing against the DB.",
+    ["label"],
+)
+FLUSH_ROWS = Histogram(
+    "contenthub_flush_rows_updated",
+    "Rows updated per flush chunk.",
+    ["label"],
+    buckets=ROW_BUCKETS,
+)
+
+
+def reset_multiprocess_dir() -> None:
+    """Drop metric files left over from a previous gunicorn master or worker run."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for f in glob.glob(os.path.join(path, "*.db")):
+            os.remove(f)
+
+
+class _QueryCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@lru_cache(maxsize=256)
+def _view_labels(view_func, method: str) -> tuple[str, str]:
+    cls = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    name = cls.__name__ if cls is not None else view_func.__name__
+    actions = getattr(view_func, "actions", None) or {}
+    return name, actions.get(method, method)
+
+
+class MetricsMiddleware:
+    """Record latency and DB query count for every resolved view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = _QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(queries))
+            response = self.get_response(request)
+        labels = getattr(request, "_metrics_labels", None)
+        if labels is not None:
+            REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+            REQUEST_QUERIES.labels(*labels).observe(queries.count)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = _view_labels(view_func, request.method.lower())
+
+
+class CounterBacklogCollector:
+    """Scrape-time view of the Redis counters buffer.
+
+    Reports pending ids per label and temp flush keys that have sat idle for
+    longer than ``COUNTER_FLUSH_ORPHAN_AGE`` seconds (a flush that died
+    between RENAME and DELETE), read from the ``views:flush:keys`` set.
+    """
+
+    def collect(self):
+        from .health import _counter_redis
+        from .tasks import _counter_key, _flush_keys_key, _label_set_key
+
+        up = GaugeMetricFamily(
+            "contenthub_counter_redis_up", "Whether the counter Redis answered."
+        )
+        pending = GaugeMetricFamily(
+            "contenthub_counter_pending_ids",
+            "Ids waiting in views:counter:{label} hashes.",
+            labels=["label"],
+        )
+        orphaned = GaugeMetricFamily(
+            "contenthub_counter_orphaned_flush_keys",
+            "Temp flush keys idle longer than COUNTER_FLUSH_ORPHAN_AGE.",
+        )
+        max_age = int(getattr(settings, "COUNTER_FLUSH_ORPHAN_AGE", 300))
+        try:
+            r = _counter_redis()
+            for raw_label in sorted(r.smembers(_label_set_key())):
+                label = raw_label.decode()
+                pending.add_metric([label], r.hlen(_counter_key(label)))
+            pipe = r.pipeline(transaction=False)
+            for key in r.smembers(_flush_keys_key()):
+                pipe.object("idletime", key)
+            idle = pipe.execute()
+            orphaned.add_metric([], sum(1 for t in idle if (t or 0) >= max_age))
+        except redis.exceptions.RedisError:
+            up.add_metric([], 0)
+            yield up
+            return
+        up.add_metric([], 1)
+        yield up
+        yield pending
+        yield orphaned
+
+
+def _build_registry() -> CollectorRegistry:
+    registry = CollectorRegistry()
+    dirs = getattr(settings, "METRICS_MULTIPROC_DIRS", None)
+    if dirs:
+        # Patterns such as /metrics/worker-flush/* pick up one dir per scaled
+        # replica; a process family that has not started yet matches nothing
+        for path in sorted({p for pattern in dirs for p in glob.glob(pattern)}):
+            if os.path.isdir(path):
+                multiprocess.MultiProcessCollector(registry, path=path)
+    else:
+        registry.register(REGISTRY)
+    registry.register(CounterBacklogCollector())
+    return registry
+
+
+def metrics_view(_request):
+    return HttpResponse(
+        generate_latest(_build_registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -5,6 +5,11 @@ from django.db import models
 
 class Page(models.Model):
     title = models.CharField(max_length=255, db_index=True)
+    # Bumped on own saves and, via signals, when contents or linked content
+    # objects change; counter flushes deliberately do not touch it.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Stable key from the source catalogue; makes import_content idempotent
+    external_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
 
     def __str__(self) -> str:
         return self.title
@@ -16,6 +21,7 @@ class Page(models.Model):
 class ContentBase(models.Model):
     title = models.CharField(max_length=255, db_index=True)
     counter = models.PositiveIntegerField(default=0)
+    external_id = models.CharField(max_length=255, unique=True, null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -0,0 +1,147 @@
+"""Opt-in per-request profiler.
+
+Enabled with ``REQUEST_PROFILER_ENABLED``; when off the middleware raises
+``MiddlewareNotUsed`` and Django drops it from the chain, so the only cost
+left is the ``getattr`` in ``profile_span``.
+
+Every profiled response gets a ``Server-Timing`` header with SQL, serializer
+and render timings. Requests slower than ``REQUEST_PROFILER_SLOW_MS`` are
+pushed, together with their SQL, into a capped Redis list (a ring buffer of
+``REQUEST_PROFILER_BUFFER_SIZE`` entries) shown in the admin.
+"""
+
+import json
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+
+import redis
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+
+_SLOW_KEY = "profiler:slow"
+_MAX_SQL = 200
+
+
+class RequestProfile:
+    __slots__ = ("queries", "db_time", "sql", "spans", "render_start")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sql: list[tuple[float, str]] = []
+        self.spans: dict[str, float] = {}
+        self.render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.sql) < _MAX_SQL:
+                self.sql.append((elapsed, sql))
+
+    def add(self, name: str, elapsed: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+
+@contextmanager
+def _span(profile: RequestProfile, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def profile_span(request, name: str):
+    """Time a block of view code (e.g. serialization) for the profiler."""
+    profile = getattr(request, "_profile", None)
+    if profile is None:
+        return nullcontext()
+    return _span(profile, name)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+def _slow_buffer():
+    # Short timeouts: a stalled Redis must not hold up the profiled request
+    from .health import _counter_redis
+
+    return _counter_redis()
+
+
+def record_slow_request(entry: dict) -> None:
+    size = int(getattr(settings, "REQUEST_PROFILER_BUFFER_SIZE", 100))
+    try:
+        pipe = _slow_buffer().pipeline(transaction=False)
+        pipe.lpush(_SLOW_KEY, json.dumps(entry))
+        pipe.ltrim(_SLOW_KEY, 0, size - 1)
+        pipe.execute()
+    except redis.exceptions.RedisError:
+        # Profiling must never break the request it is profiling
+        pass
+
+
+def slow_requests() -> list[dict]:
+    """Sampled slow requests, slowest first."""
+    try:
+        raw = _slow_buffer().lrange(_SLOW_KEY, 0, -1)
+    except redis.exceptions.RedisError:
+        return []
+    entries = [json.loads(item) for item in raw]
+    return sorted(entries, key=lambda e: e["total_ms"], reverse=True)
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILER_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = float(getattr(settings, "REQUEST_PROFILER_SLOW_MS", 500))
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        request._profile = profile
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(profile))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        timings = [f'db;dur={_ms(profile.db_time)};desc="{profile.queries} queries"']
+        timings += [f"{name};dur={_ms(t)}" for name, t in profile.spans.items()]
+        timings.append(f"total;dur={_ms(total)}")
+        response["Server-Timing"] = ", ".join(timings)
+
+        if total * 1000 >= self.slow_ms:
+            record_slow_request(
+                {
+                    "at": timezone.now().isoformat(),
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "status": response.status_code,
+                    "total_ms": _ms(total),
+                    "queries": profile.queries,
+                    "db_ms": _ms(profile.db_time),
+                    "spans": {k: _ms(v) for k, v in profile.spans.items()},
+                    "sql": [[_ms(t), sql] for t, sql in profile.sql],
+                }
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before render(); the callback fires right after it
+        profile = request._profile
+        profile.render_start = time.perf_counter()
+        response.add_post_render_callback(
+            lambda r: profile.add("render", time.perf_counter() - profile.render_start)
+        )
+        return response
@@ -10,35 +10,67 @@ class PageListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Page
-        fields = ["id", "title", "url"]
+        fields = ["id", "title", "updated_at", "url"]
 
 
-class VideoContentSerializer(serializers.ModelSerializer):
+ALWAYS_INCLUDED_FIELDS = ("id", "type")
+
+
+class ContentSerializerMixin:
+    """Common bits of content item serializers.
+
+    ``type_name`` is the public ``type`` value (also accepted by
+    ``?types=``). When ``context["content_fields"]`` is set only those fields
+    are emitted, plus ``id`` and ``type``.
+    """
+
+    type_name = ""
+
+    def get_type(self, obj) -> str:
+        return self.type_name
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted = self.context.get("content_fields")
+        if wanted is None:
+            return fields
+        return {
+            name: field
+            for name, field in fields.items()
+            if name in wanted or name in ALWAYS_INCLUDED_FIELDS
+        }
+
+
+class VideoContentSerializer(ContentSerializerMixin, serializers.ModelSerializer):
+    type_name = "video"
     type = serializers.SerializerMethodField()
 
     class Meta:
         model = VideoContent
         fields = ["id", "type", "title", "counter", "file_url", "subtitles_url"]
 
-    def get_type(self, obj) -> str:
-        return "video"
-
 
-class AudioContentSerializer(serializers.ModelSerializer):
+class AudioContentSerializer(ContentSerializerMixin, serializers.ModelSerializer):
+    type_name = "audio"
     type = serializers.SerializerMethodField()
 
     class Meta:
         model = AudioContent
         fields = ["id", "type", "title", "counter", "text"]
 
-    def get_type(self, obj) -> str:
-        return "audio"
-
 
 CONTENT_SERIALIZER_MAP: Dict[Type, Type[serializers.ModelSerializer]] = {
     VideoContent: VideoContentSerializer,
     AudioContent: AudioContentSerializer,
 }
+CONTENT_TYPE_MODELS: Dict[str, Type] = {
+    serializer.type_name: model for model, serializer in CONTENT_SERIALIZER_MAP.items()
+}
+CONTENT_FIELDS = {
+    name
+    for serializer in CONTENT_SERIALIZER_MAP.values()
+    for name in serializer.Meta.fields
+}
 
 
 class PageContentSerializer(serializers.Serializer):
@@ -55,4 +87,4 @@ class PageDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Page
-        fields = ["id", "title", "contents"]
+        fields = ["id", "title", "updated_at", "contents"]
@@ -0,0 +1,57 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .caching import invalidate_pages
+from .models import ContentBase, Page, PageContent
+
+
+def touch_pages(**filters) -> int:
+    """Bump ``Page.updated_at`` for pages matching ``filters``.
+
+    Also invalidates cached page->contents maps and upstream HTTP caches.
+    """
+    page_ids = list(Page.objects.filter(**filters).values_list("pk", flat=True))
+    if not page_ids:
+        return 0
+    invalidate_pages(page_ids)
+    return Page.objects.filter(pk__in=page_ids).update(updated_at=timezone.now())
+
+
+def _page_changed(sender, instance: Page, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_pages([instance.pk])
+
+
+def _page_content_changed(sender, instance: PageContent, raw=False, **kwargs):
+    if raw:
+        # Fixture loading: keep the timestamps from the fixture
+        return
+    touch_pages(pk=instance.page_id)
+
+
+def _content_changed(sender, instance: ContentBase, raw=False, **kwargs):
+    if raw:
+        return
+    ct = ContentType.objects.get_for_model(sender)
+    touch_pages(contents__content_type=ct, contents__object_id=instance.pk)
+
+
+def connect(models) -> None:
+    for name, signal in (("save", post_save), ("delete", post_delete)):
+        signal.connect(
+            _page_changed, sender=Page, dispatch_uid=f"pages:touch:{name}:Page"
+        )
+        signal.connect(
+            _page_content_changed,
+            sender=PageContent,
+            dispatch_uid=f"pages:touch:{name}:PageContent",
+        )
+        for model in models:
+            if issubclass(model, ContentBase) and not model._meta.abstract:
+                signal.connect(
+                    _content_changed,
+                    sender=model,
+                    dispatch_uid=f"pages:touch:{name}:{model._meta.label}",
+                )
@@ -1,15 +1,40 @@
+import logging
+import time
+import urllib.error
+import urllib.request
 import uuid
+from collections import Counter, defaultdict
 from typing import Dict
 
 import redis
 from celery import shared_task
+from celery.utils.time import get_exponential_backoff_interval
+from celery_batches import Batches
 from django.apps import apps
 from django.conf import settings
-from django.db import connection
+from django.db import InterfaceError, OperationalError, connection, transaction
 from django.db.models import F
+from django.urls import reverse
+
+from .metrics import (
+    FLUSH_DROPPED,
+    FLUSH_DURATION,
+    FLUSH_ROWS,
+    INGEST_IMPRESSIONS,
+    INGEST_TASKS,
+)
+
+logger = logging.getLogger(__name__)
 
 _REDIS = None
 _DEDUP_TTL = int(getattr(settings, "COUNTER_DEDUP_TTL", 15 * 60))  # seconds
+_FLUSH_QUEUE = getattr(settings, "COUNTER_FLUSH_QUEUE", "flush")
+_INGEST_BATCH_SIZE = int(getattr(settings, "COUNTER_INGEST_BATCH_SIZE", 500))
+_INGEST_BATCH_INTERVAL = float(getattr(settings, "COUNTER_INGEST_BATCH_INTERVAL", 1.0))
+_FLUSH_MAX_WRITERS = max(1, int(getattr(settings, "COUNTER_FLUSH_MAX_WRITERS", 2)))
+_WRITER_SLOT_TTL = int(getattr(settings, "COUNTER_FLUSH_WRITER_TTL", 60))  # seconds
+_WRITER_RETRY_DELAY = 0.5  # seconds
+_FLUSH_DB_RETRIES = int(getattr(settings, "COUNTER_FLUSH_DB_RETRIES", 10))
 
 
 def _redis_client() -> redis.Redis:
@@ -31,105 +56,319 @@ def _counter_key(model_label: str) -> str:
     return f"views:counter:{model_label}"
 
 
+def _flush_keys_key() -> str:
+    # Temp flush keys in flight, so monitoring never has to SCAN for them
+    return "views:flush:keys"
+
+
 def _dedup_key(task_id: str) -> str:
     return f"views:dedup:{task_id}"
 
 
-@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
-def ingest_impressions(self, model_label: str, ids: list[int]) -> None:
+@shared_task(
+    base=Batches,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    flush_every=_INGEST_BATCH_SIZE,
+    flush_interval=_INGEST_BATCH_INTERVAL,
+)
+def ingest_impressions(requests) -> None:
     """Aggregate impressions in Redis.
 
+    Called as ``ingest_impressions.delay(model_label, ids)``; the worker
+    buffers up to ``COUNTER_INGEST_BATCH_SIZE`` messages (or
+    ``COUNTER_INGEST_BATCH_INTERVAL`` seconds) and runs them as one batch:
+
     - Dedup by Celery task_id to be safe on re-delivery (TTL configurable)
     - HINCRBY per id in a pipeline
     - Track active labels for the flusher via a Redis set
     """
+    _ingest_batch(requests, _impressions_counts)
+
+
+@shared_task(
+    base=Batches,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    flush_every=_INGEST_BATCH_SIZE,
+    flush_interval=_INGEST_BATCH_INTERVAL,
+)
+def ingest_impression_counts(requests) -> None:
+    """Aggregate impressions for several labels per message.
+
+    Called as ``ingest_impression_counts.delay(counts)`` where ``counts``
+    maps model label -> {object id: impressions}; used by bulk endpoints so a
+    whole feed costs one message instead of one per label. Batched on the
+    worker like ``ingest_impressions``.
+    """
+    _ingest_batch(requests, _label_counts)
+
+
+def _impressions_counts(model_label: str, ids: list[int]) -> Dict[str, Dict[int, int]]:
+    return {model_label: Counter(int(_id) for _id in ids)}
+
+
+def _label_counts(counts: dict[str, dict[str, int]]) -> Dict[str, Dict[int, int]]:
+    return {
+        label: {int(_id): int(n) for _id, n in per_id.items()}
+        for label, per_id in counts.items()
+    }
+
+
+def _ingest_batch(requests, to_counts) -> None:
+    eager = getattr(settings, "RUNNING_TESTS", False) or getattr(
+        settings, "CELERY_TASK_ALWAYS_EAGER", False
+    )
+    r = None
+    if not eager:
+        # ensure idempotency for re-delivery: one SET NX per message, one trip
+        r = _redis_client()
+        pipe = r.pipeline(transaction=False)
+        for request in requests:
+            pipe.set(_dedup_key(request.id), 1, nx=True, ex=_DEDUP_TTL)
+        requests = [req for req, new in zip(requests, pipe.execute()) if new]
+
+    counts: Dict[str, Counter] = defaultdict(Counter)
+    messages: Counter = Counter()
+    for request in requests:
+        try:
+            parsed = to_counts(*request.args, **request.kwargs)
+        except (TypeError, ValueError, AttributeError):
+            # One malformed message must not drop the rest of the batch
+            logger.warning("Dropping malformed ingest message %s", request.id)
+            continue
+        for label, per_id in parsed.items():
+            messages[label] += 1
+            counts[label].update(per_id)
+    for label, per_id in counts.items():
+        INGEST_TASKS.labels(label).inc(messages[label])
+        INGEST_IMPRESSIONS.labels(label).inc(sum(per_id.values()))
+
     # In tests/eager mode, increment counters directly in DB to make
     # behavior deterministic without relying on Redis/beat flusher.
-    if getattr(settings, "RUNNING_TESTS", False) or getattr(
-        settings, "CELERY_TASK_ALWAYS_EAGER", False
-    ):
-        if ids:
-            _flush_label_to_db(model_label, {int(_id): 1 for _id in ids})
+    if eager:
+        for label, per_id in counts.items():
+            if per_id:
+                _flush_label_to_db(label, per_id)
         return
+    if counts:
+        incr_counters(r, counts)
 
-    r = _redis_client()
-    task_id = getattr(getattr(self, "request", None), "id", None)
-    if task_id:
-        # ensure idempotency for re-delivery
-        if not r.set(_dedup_key(task_id), 1, nx=True, ex=_DEDUP_TTL):
-            return
 
+def incr_counters(r: redis.Redis, counts: Dict[str, Dict[int, int]]) -> None:
+    """HINCRBY ``counts`` into the label hashes and register the labels.
+
+    Shared by the ingest tasks and out-of-band ingesters such as the
+    ``ingest_impression_log`` command; the flusher picks them up alike.
+    """
     pipe = r.pipeline(transaction=False)
-    key = _counter_key(model_label)
-    for _id in ids:
-        pipe.hincrby(key, str(int(_id)), 1)
-    pipe.sadd(_label_set_key(), model_label)
+    for label, per_id in counts.items():
+        key = _counter_key(label)
+        for _id, n in per_id.items():
+            pipe.hincrby(key, str(_id), n)
+        pipe.sadd(_label_set_key(), label)
     pipe.execute()
 
 
 @shared_task(acks_late=True, reject_on_worker_lost=True)
 def flush_impressions(batch_size: int = 1000) -> None:
-    """Periodically flush aggregated counters from Redis to DB in batches.
+    """Periodically hand aggregated counters over to per-label flush tasks.
 
     Uses RENAME to a temp key to atomically swap out the active hash, then
-    processes the temp key with HSCAN to avoid blocking.
+    fans the temp key out to ``flush_label`` on the ``flush`` queue so a large
+    backlog on one label does not hold up the others.
     """
     r = _redis_client()
     labels = r.smembers(_label_set_key())
     if not labels:
         return
 
-    for raw_label in labels:
+    for raw_label in sorted(labels):
         label = raw_label.decode()
         src = _counter_key(label)
-        tmp = f"{src}:flush:{uuid.uuid4().hex}"
+        tmp = _flush_tmp_key(label)
         try:
             # Atomically move the hash to a temp key if it exists
             if not r.exists(src):
                 # No data currently; skip
                 continue
-            r.rename(src, tmp)
+            pipe = r.pipeline()
+            pipe.rename(src, tmp)
+            pipe.sadd(_flush_keys_key(), tmp)
+            pipe.execute()
         except redis.exceptions.ResponseError:
             # Key disappeared between exists and rename — skip
+            r.srem(_flush_keys_key(), tmp)
             continue
 
-        success = False
-        try:
-            # Consume temp key in chunks
-            cursor = 0
-            accum: Dict[int, int] = {}
-            while True:
-                cursor, chunk = r.hscan(tmp, cursor=cursor, count=batch_size)
-                for k, v in chunk.items():
-                    accum[int(k)] = accum.get(int(k), 0) + int(v)
-
-                # Flush in DB-sized chunks to keep SQL manageable
-                if len(accum) >= batch_size:
-                    _flush_label_to_db(label, accum)
-                    accum.clear()
-
-                if cursor == 0:
-                    break
-
-            if accum:
-                _flush_label_to_db(label, accum)
-            success = True
-        finally:
-            if success:
-                r.delete(tmp)
-
-
-def _flush_label_to_db(model_label: str, deltas: Dict[int, int]) -> None:
+        flush_label.apply_async((label, tmp, batch_size), queue=_FLUSH_QUEUE)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def flush_label(label: str, tmp: str, batch_size: int = 1000) -> None:
+    """Split a renamed counter hash into DB-sized ``flush_chunk`` tasks.
+
+    The temp key is consumed with HSCAN to avoid blocking Redis. Each chunk
+    is published as soon as it fills up and its fields are then HDEL'ed, so
+    a re-delivered task only publishes what is left; at most the chunk in
+    flight at a crash can be published twice.
+    """
+    r = _redis_client()
+    cursor = 0
+    accum: Dict[bytes, int] = {}
+    while True:
+        cursor, fields = r.hscan(tmp, cursor=cursor, count=batch_size)
+        # A hash field has one value; HSCAN may repeat it, so never sum
+        accum.update((k, int(v)) for k, v in fields.items())
+
+        # Flush in DB-sized chunks to keep SQL manageable
+        if len(accum) >= batch_size or (cursor == 0 and accum):
+            rows = _delta_rows({int(k): v for k, v in accum.items()})
+            flush_chunk.apply_async((label, rows), queue=_FLUSH_QUEUE)
+            r.hdel(tmp, *accum)
+            accum = {}
+
+        if cursor == 0:
+            break
+
+    pipe = r.pipeline()
+    pipe.delete(tmp)
+    pipe.srem(_flush_keys_key(), tmp)
+    pipe.execute()
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=None)
+def flush_chunk(self, label: str, rows: list[list[int]], db_attempts: int = 0) -> None:
+    """Apply one chunk of ``[pk, delta]`` rows to the DB.
+
+    Holds one of ``COUNTER_FLUSH_MAX_WRITERS`` writer slots for the duration
+    of the write; when all slots are taken the task is retried shortly
+    instead of piling another transaction onto the database.
+
+    The task is the only copy of its deltas, so lost DB connections are
+    retried with backoff up to ``COUNTER_FLUSH_DB_RETRIES`` times (counted
+    apart from the unlimited waits for a slot) before the chunk is dropped.
+    """
+    slot = _acquire_writer_slot()
+    if slot is None:
+        raise self.retry(countdown=_WRITER_RETRY_DELAY)
+    start = time.perf_counter()
+    try:
+        updated = _flush_label_to_db(label, {int(pk): int(delta) for pk, delta in rows})
+        FLUSH_ROWS.labels(label).observe(updated)
+        FLUSH_DURATION.labels(label).observe(time.perf_counter() - start)
+    except (OperationalError, InterfaceError) as exc:
+        if db_attempts >= _FLUSH_DB_RETRIES:
+            dropped = sum(int(delta) for _, delta in rows)
+            FLUSH_DROPPED.labels(label).inc(dropped)
+            logger.error(
+                "Dropping flush chunk of %s (%d rows, %d impressions): %s",
+                label,
+                len(rows),
+                dropped,
+                exc,
+            )
+            raise
+        raise self.retry(
+            exc=exc,
+            kwargs={"db_attempts": db_attempts + 1},
+            countdown=get_exponential_backoff_interval(
+                factor=1, retries=db_attempts, maximum=300, full_jitter=True
+            ),
+        )
+    finally:
+        _release_writer_slot(slot)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def purge_page_cache(page_ids: list[int]) -> None:
+    """Refresh cached API responses for ``page_ids`` in every nginx endpoint.
+
+    nginx OSS has no PURGE; instead a request from a private network whose
+    ``X-Cache-Purge`` header carries ``API_CACHE_PURGE_TOKEN`` bypasses the
+    cache and stores the fresh response (see ``nginx/nginx.conf``). Detail
+    URLs and the first list page are refreshed; other query variants expire
+    with ``API_CACHE_MAX_AGE``.
+    """
+    token = getattr(settings, "API_CACHE_PURGE_TOKEN", "")
+    if not token:
+        logger.warning("API_CACHE_PURGE_TOKEN is not set; skipping cache purge.")
+        return
+    host = getattr(settings, "API_CACHE_PURGE_HOST", "") or settings.ALLOWED_HOSTS[0]
+    paths = [reverse("page-list")] + [
+        reverse("page-detail", args=[pk]) for pk in page_ids
+    ]
+    for endpoint in getattr(settings, "API_CACHE_PURGE_ENDPOINTS", []):
+        for path in paths:
+            req = urllib.request.Request(
+                endpoint.rstrip("/") + path,
+                headers={"Host": host, "X-Cache-Purge": token},
+            )
+            try:
+                urllib.request.urlopen(req, timeout=5).close()
+            except urllib.error.HTTPError as exc:
+                # 404 for a deleted page still refreshes (evicts) the entry
+                if exc.code != 404:
+                    logger.warning("Cache purge of %s failed: %s", path, exc)
+            except (urllib.error.URLError, OSError) as exc:
+                logger.warning("Cache purge of %s failed: %s", path, exc)
+
+
+def _flush_tmp_key(model_label: str) -> str:
+    return f"{_counter_key(model_label)}:flush:{uuid.uuid4().hex}"
+
+
+def _writer_slot_key(slot: int) -> str:
+    return f"views:flush:writer:{slot}"
+
+
+def _delta_rows(deltas: Dict[int, int]) -> list[list[int]]:
+    # JSON-friendly and sorted by pk so chunks lock rows in a stable order
+    return [[pk, delta] for pk, delta in sorted(deltas.items())]
+
+
+def _acquire_writer_slot() -> str | None:
+    """Claim a free DB writer slot, or return ``None`` if all are busy.
+
+    Slots carry a TTL so a worker killed mid-write cannot leak one forever.
+    """
+    r = _redis_client()
+    token = uuid.uuid4().hex
+    for slot in range(_FLUSH_MAX_WRITERS):
+        key = _writer_slot_key(slot)
+        if r.set(key, token, nx=True, ex=_WRITER_SLOT_TTL):
+            return f"{key}|{token}"
+    return None
+
+
+def _release_writer_slot(slot: str) -> None:
+    key, token = slot.split("|", 1)
+    r = _redis_client()
+    # Only release our own claim; the slot may have expired and been re-taken
+    current = r.get(key)
+    if current is not None and current.decode() == token:
+        r.delete(key)
+
+
+def _flush_label_to_db(model_label: str, deltas: Dict[int, int]) -> int:
+    """Add ``deltas`` to ``counter`` of ``model_label`` rows; return rows updated."""
     model = apps.get_model(model_label)
     if model is None or not deltas:
-        return
+        return 0
+    # Rows are always touched in ascending pk order so concurrent flushers
+    # over overlapping ids queue on each other instead of deadlocking.
+    pks = sorted(int(pk) for pk in deltas)
     # Use efficient bulk SQL for PostgreSQL, fallback to ORM updates elsewhere
     if connection.vendor == "postgresql":
         table = connection.ops.quote_name(model._meta.db_table)
         pkcol = connection.ops.quote_name(model._meta.pk.column)
 
-        rows = [(int(pk), int(delta)) for pk, delta in deltas.items()]
+        rows = [(pk, int(deltas[pk])) for pk in pks]
         placeholders = ",".join(["(%s,%s)"] * len(rows))
+        lock_sql = (
+            f"SELECT {pkcol} FROM {table} "
+            f"WHERE {pkcol} = ANY(%s) ORDER BY {pkcol} FOR UPDATE"
+        )
         sql = (
             f"UPDATE {table} AS t "
             f"SET counter = t.counter + v.delta "
@@ -137,8 +376,14 @@ def _flush_label_to_db(model_label: str, deltas: Dict[int, int]) -> None:
             f"WHERE t.{pkcol} = v.id"
         )
         params = [item for row in rows for item in row]
-        with connection.cursor() as cur:
+        with transaction.atomic(), connection.cursor() as cur:
+            cur.execute(lock_sql, [pks])
             cur.execute(sql, params)
-    else:
-        for pk, delta in deltas.items():
-            model.objects.filter(pk=int(pk)).update(counter=F("counter") + int(delta))
+            return cur.rowcount
+    updated = 0
+    with transaction.atomic():
+        for pk in pks:
+            updated += model.objects.filter(pk=pk).update(
+                counter=F("counter") + int(deltas[pk])
+            )
+    return updated
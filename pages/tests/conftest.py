@@ -0,0 +1,147 @@
+import fnmatch
+import itertools
+
+import pytest
+import redis
+from django.core.cache import cache
+
+from pages import health, tasks
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the counter Redis used by the tasks."""
+
+    def __init__(self):
+        self.data = {}
+        self.idle = {}
+        self.cursors = {}
+        self.cursor_ids = itertools.count(1)
+
+    @staticmethod
+    def _b(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def ping(self):
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self._b(value)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def rename(self, src, dst):
+        if src not in self.data:
+            raise redis.exceptions.ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+
+    def hincrby(self, key, field, amount=1):
+        h = self.data.setdefault(key, {})
+        field = self._b(field)
+        h[field] = self._b(int(h.get(field, b"0")) + amount)
+        return int(h[field])
+
+    def hdel(self, key, *fields):
+        h = self.data.get(key, {})
+        return sum(1 for f in fields if h.pop(self._b(f), None) is not None)
+
+    def hlen(self, key):
+        return len(self.data.get(key, {}))
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hscan(self, key, cursor=0, count=10):
+        # Cursors remember the last field, so HDEL mid-scan skips nothing
+        after = self.cursors.pop(cursor) if cursor else b""
+        items = sorted(i for i in self.data.get(key, {}).items() if i[0] > after)
+        chunk = dict(items[:count])
+        if len(items) <= count:
+            return 0, chunk
+        nxt = next(self.cursor_ids)
+        self.cursors[nxt] = items[count - 1][0]
+        return nxt, chunk
+
+    def lpush(self, key, *values):
+        lst = self.data.setdefault(key, [])
+        for value in values:
+            lst.insert(0, self._b(value))
+        return len(lst)
+
+    def ltrim(self, key, start, end):
+        self.data[key] = self.data.get(key, [])[start : end + 1]
+
+    def lrange(self, key, start, end):
+        lst = self.data.get(key, [])
+        return lst[start:] if end == -1 else lst[start : end + 1]
+
+    def sadd(self, key, *members):
+        s = self.data.setdefault(key, set())
+        before = len(s)
+        s.update(self._b(m) for m in members)
+        return len(s) - before
+
+    def srem(self, key, *members):
+        s = self.data.get(key, set())
+        before = len(s)
+        s.difference_update(self._b(m) for m in members)
+        if not s:  # Redis drops empty sets
+            self.data.pop(key, None)
+        return before - len(s)
+
+    def scard(self, key):
+        return len(self.data.get(key, set()))
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def object(self, infotype, key):
+        return self.idle.get(key, 0) if infotype == "idletime" else None
+
+    def scan_iter(self, match=None, count=None):
+        for key in list(self.data):
+            if match is None or fnmatch.fnmatchcase(key, match):
+                yield key.encode()
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self):
+        results = [getattr(self.client, n)(*a, **kw) for n, a, kw in self.calls]
+        self.calls = []
+        return results
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(tasks, "_REDIS", client)
+    monkeypatch.setattr(health, "_COUNTER_REDIS", client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
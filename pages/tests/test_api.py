@@ -1,19 +1,26 @@
+from datetime import timedelta
+
 import pytest
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
 from django.test import override_settings
-from django.urls import reverse
+from django.urls import resolve, reverse
 from rest_framework.test import APIClient
 
+from pages import tasks
 from pages.models import AudioContent, Page, PageContent, VideoContent
 
 
 @pytest.mark.django_db
-def test_page_list_returns_pages():
+def test_page_list_returns_pages(django_assert_num_queries):
     page = Page.objects.create(title="Page 1")
     client = APIClient()
     url = reverse("page-list")
-    resp = client.get(url)
+    # validators aggregate (max + count, reused by the paginator) + page rows
+    with django_assert_num_queries(2):
+        resp = client.get(url)
     assert resp.status_code == 200
+    assert resp.data["count"] == 1
     assert resp.data["results"][0]["title"] == page.title
     assert "url" in resp.data["results"][0]
 
@@ -42,3 +49,198 @@ def test_page_detail_returns_contents_and_increments_counters():
     audio.refresh_from_db()
     assert video.counter == 1
     assert audio.counter == 1
+
+
+def _page_with_contents(title, *objs):
+    page = Page.objects.create(title=title)
+    for obj in objs:
+        PageContent.objects.create(
+            page=page,
+            content_type=ContentType.objects.get_for_model(obj),
+            object_id=obj.id,
+        )
+    return page
+
+
+@pytest.mark.django_db
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+def test_page_bulk_returns_pages_in_order_with_constant_queries(
+    django_assert_max_num_queries, monkeypatch
+):
+    from pages import views
+
+    videos = [
+        VideoContent.objects.create(title=f"V{i}", file_url="http://e.com/v.mp4")
+        for i in range(3)
+    ]
+    audio = AudioContent.objects.create(title="A", text="hello")
+    pages = [_page_with_contents(f"P{i}", v, audio) for i, v in enumerate(videos)]
+
+    calls = []
+    monkeypatch.setattr(views.ingest_impression_counts, "delay", calls.append)
+    ids = [pages[2].id, pages[0].id, 999999]
+    url = reverse("page-bulk") + "?ids=" + ",".join(map(str, ids))
+    # pages + page contents + one query per content type, regardless of #pages
+    with django_assert_max_num_queries(4):
+        resp = APIClient().get(url)
+    assert resp.status_code == 200
+    assert [p["id"] for p in resp.data] == [pages[2].id, pages[0].id]
+    assert [c["type"] for c in resp.data[0]["contents"]] == ["video", "audio"]
+
+    assert len(calls) == 1
+    views.ingest_impression_counts.apply(args=(calls[0],))
+    audio.refresh_from_db()
+    assert audio.counter == 2
+    assert [v.counter for v in VideoContent.objects.order_by("id")] == [1, 0, 1]
+
+
+@pytest.mark.django_db
+def test_page_bulk_validates_ids():
+    client = APIClient()
+    url = reverse("page-bulk")
+    assert client.get(url).status_code == 400
+    assert client.get(url + "?ids=1,x").status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 52))
+    assert client.get(url + "?ids=" + too_many).status_code == 400
+
+
+@pytest.mark.django_db
+def test_page_detail_types_and_fields_narrow_queries_and_output(
+    django_assert_num_queries, monkeypatch
+):
+    from pages import views
+
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    audio = AudioContent.objects.create(title="A", text="long text")
+    page = _page_with_contents("P", video, audio)
+    calls = []
+    monkeypatch.setattr(
+        views.ingest_impressions, "delay", lambda *args: calls.append(args)
+    )
+
+    client = APIClient()
+    url = reverse("page-detail", args=[page.id])
+    # page + page contents (video only) + video rows; audio is never queried
+    with django_assert_num_queries(3) as ctx:
+        resp = client.get(url, {"types": "video", "fields": "title"})
+    assert resp.status_code == 200
+    assert resp.data["contents"] == [{"id": video.id, "type": "video", "title": "V"}]
+    assert '"file_url"' not in ctx.captured_queries[-1]["sql"]
+    assert calls == [("pages.videocontent", [video.id])]
+
+    with django_assert_num_queries(4) as ctx:
+        resp = client.get(url, {"fields": "type"})
+    audio_sql = next(
+        q["sql"] for q in ctx.captured_queries if "pages_audiocontent" in q["sql"]
+    )
+    assert '"text"' not in audio_sql
+    assert resp.data["contents"] == [
+        {"id": video.id, "type": "video"},
+        {"id": audio.id, "type": "audio"},
+    ]
+
+    assert client.get(url, {"types": "image"}).status_code == 400
+    assert client.get(url, {"fields": "secret"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_page_updated_at_bumps_on_contents_and_linked_content_changes():
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    audio = AudioContent.objects.create(title="A", text="t")
+    page = _page_with_contents("P", video, audio)
+    other = Page.objects.create(title="Other")
+
+    def stamp(p):
+        return Page.objects.values_list("updated_at", flat=True).get(pk=p.pk)
+
+    before, other_before = stamp(page), stamp(other)
+    video.title = "V2"
+    video.save()
+    assert stamp(page) > before
+    assert stamp(other) == other_before
+
+    before = stamp(page)
+    page.contents.filter(object_id=audio.id).delete()
+    assert stamp(page) > before
+
+    # Counter flushes must not invalidate caches
+    before = stamp(page)
+    VideoContent.objects.filter(pk=video.pk).update(counter=10)
+    assert stamp(page) == before
+
+
+@pytest.mark.django_db
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+def test_page_list_and_detail_support_conditional_requests():
+    page = Page.objects.create(title="P1")
+    client = APIClient()
+    url = reverse("page-list")
+
+    resp = client.get(url)
+    last_modified, etag = resp["Last-Modified"], resp["ETag"]
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code == 304
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    latest = Page.objects.create(title="P2")
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp["ETag"] != etag
+
+    # An edit within the same second keeps the count and the Last-Modified second
+    etag = resp["ETag"]
+    Page.objects.filter(pk=latest.pk).update(
+        title="P2 renamed", updated_at=F("updated_at") + timedelta(microseconds=1)
+    )
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    detail = reverse("page-detail", args=[page.id])
+    resp = client.get(detail)
+    assert resp.status_code == 200
+    assert "Last-Modified" not in resp
+    resp = client.get(detail, HTTP_IF_NONE_MATCH=resp["ETag"])
+    assert resp.status_code == 304
+    assert client.get(reverse("page-detail", args=["x"])).status_code == 404
+
+
+@pytest.mark.django_db
+@override_settings(IMPRESSIONS_SOURCE="beacon")
+def test_page_detail_etag_changes_when_counters_are_flushed():
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    page = _page_with_contents("P", video)
+    client = APIClient()
+    url = reverse("page-detail", args=[page.id])
+    etag = client.get(url)["ETag"]
+    titles_etag = client.get(url, {"fields": "title"})["ETag"]
+
+    # Flushes do not bump Page.updated_at
+    tasks._flush_label_to_db("pages.videocontent", {video.id: 500})
+    resp = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == 200
+    assert resp.data["contents"][0]["counter"] == 500
+    assert client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"]).status_code == 304
+    # Without counters in the body the page is still unchanged
+    resp = client.get(url, {"fields": "title"}, HTTP_IF_NONE_MATCH=titles_etag)
+    assert resp.status_code == 304
+
+
+@pytest.mark.django_db
+def test_page_list_changed_since_returns_only_deltas():
+    old = Page.objects.create(title="Old")
+    Page.objects.filter(pk=old.pk).update(updated_at="2020-01-01T00:00:00Z")
+    new = Page.objects.create(title="New")
+
+    client = APIClient()
+    resp = client.get(reverse("page-list"), {"changed_since": "2024-01-01T00:00:00Z"})
+    assert [p["id"] for p in resp.data["results"]] == [new.id]
+    resp = client.get(reverse("page-list"), {"changed_since": "yesterday"})
+    assert resp.status_code == 400
+
+
+def test_schema_views_are_imported_lazily_and_still_served():
+    from config import urls
+
+    view = resolve(reverse("schema")).func
+    assert isinstance(view, urls.LazyView)
+    resp = APIClient().get(reverse("schema"))
+    assert resp.status_code == 200
+    assert "/api/v1/pages/" in resp.content.decode()
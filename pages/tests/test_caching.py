@@ -0,0 +1,136 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pages import tasks
+from pages.caching import page_content_ids
+from pages.models import AudioContent, Page, PageContent, VideoContent
+
+
+def _page_with_video():
+    page = Page.objects.create(title="P")
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    PageContent.objects.create(page=page, content_object=video)
+    return page, video
+
+
+@pytest.mark.django_db
+@override_settings(API_CACHE_MAX_AGE=5)
+def test_anonymous_reads_are_cacheable_and_tagged():
+    page, _ = _page_with_video()
+    client = APIClient()
+
+    resp = client.get(reverse("page-list"))
+    assert "s-maxage=5" in resp["Cache-Control"]
+    assert "public" in resp["Cache-Control"]
+    assert resp["Surrogate-Key"] == "pages"
+
+    resp = client.get(reverse("page-detail", args=[page.id]))
+    assert resp["Surrogate-Key"] == f"page-{page.id}"
+
+    user = get_user_model().objects.create_user("u", password="pw")
+    client.force_authenticate(user)
+    resp = client.get(reverse("page-list"))
+    assert "private" in resp["Cache-Control"]
+    assert "Surrogate-Key" not in resp
+
+
+@pytest.mark.django_db
+@override_settings(IMPRESSIONS_SOURCE="beacon", CELERY_TASK_ALWAYS_EAGER=True)
+def test_beacon_counts_impressions_instead_of_retrieve():
+    page, video = _page_with_video()
+    client = APIClient()
+
+    client.get(reverse("page-detail", args=[page.id]))
+    video.refresh_from_db()
+    assert video.counter == 0
+
+    resp = client.post(reverse("page-impression", args=[page.id]))
+    assert resp.status_code == 204
+    video.refresh_from_db()
+    assert video.counter == 1
+
+
+@pytest.mark.django_db
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+def test_beacon_is_noop_unless_enabled():
+    page, video = _page_with_video()
+    resp = APIClient().post(reverse("page-impression", args=[page.id]))
+    assert resp.status_code == 204
+    video.refresh_from_db()
+    assert video.counter == 0
+
+
+@pytest.mark.django_db
+@override_settings(
+    API_CACHE_PURGE_ENDPOINTS=["http://nginx"], IMPRESSIONS_SOURCE="beacon"
+)
+def test_content_changes_invalidate_maps_and_purge_upstream(
+    django_capture_on_commit_callbacks, monkeypatch
+):
+    page, video = _page_with_video()
+    assert page_content_ids(page.id) == {"pages.videocontent": [video.id]}
+
+    purged = []
+    monkeypatch.setattr(tasks.purge_page_cache, "delay", purged.append)
+    with django_capture_on_commit_callbacks(execute=True):
+        audio = AudioContent.objects.create(title="A", text="t")
+        PageContent.objects.create(page=page, content_object=audio)
+    assert purged == [[page.id]]
+    assert cache.get(f"pages:contents:{page.id}") is None
+    assert page_content_ids(page.id) == {
+        "pages.videocontent": [video.id],
+        "pages.audiocontent": [audio.id],
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("source", ["request", "beacon"])
+def test_saves_survive_a_cache_outage(source, monkeypatch):
+    calls = []
+
+    def delete_many(keys):
+        calls.append(keys)
+        raise ConnectionError("cache down")
+
+    monkeypatch.setattr(cache, "delete_many", delete_many)
+    with override_settings(IMPRESSIONS_SOURCE=source):
+        page, _ = _page_with_video()
+        page.title = "Renamed"
+        page.save()
+    # request mode keeps no maps, so it never touches the cache on writes
+    assert bool(calls) == (source == "beacon")
+
+
+@override_settings(
+    API_CACHE_PURGE_ENDPOINTS=["http://nginx/"],
+    API_CACHE_PURGE_HOST="api.local",
+    API_CACHE_PURGE_TOKEN="s3cret",
+)
+def test_purge_page_cache_refreshes_list_and_details(monkeypatch):
+    requests = []
+
+    class Resp:
+        def close(self):
+            pass
+
+    def urlopen(req, timeout):
+        requests.append((req.full_url, req.get_header("Host"), req.headers))
+        return Resp()
+
+    monkeypatch.setattr(tasks.urllib.request, "urlopen", urlopen)
+    tasks.purge_page_cache([3])
+    assert [url for url, _, _ in requests] == [
+        "http://nginx/api/v1/pages/",
+        "http://nginx/api/v1/pages/3/",
+    ]
+    assert all(host == "api.local" for _, host, _ in requests)
+    assert all(h["X-cache-purge"] == "s3cret" for _, _, h in requests)
+
+    requests.clear()
+    with override_settings(API_CACHE_PURGE_TOKEN=""):
+        tasks.purge_page_cache([3])
+    assert requests == []
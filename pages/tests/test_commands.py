@@ -0,0 +1,293 @@
+import os
+import re
+import signal
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+
+from pages.management.commands import ingest_impression_log
+from pages.management.commands.ingest_impression_log import FollowFile, parse_page_id
+from pages.models import AudioContent, Page, PageContent, VideoContent
+
+
+def test_parse_page_id_accepts_plain_and_syslog_lines():
+    assert parse_page_id("200 GET 42\n") == 42
+    assert parse_page_id("<190>Oct 19 10:00:00 nginx: 304 GET 7") == 7
+    assert parse_page_id("404 GET 42") is None
+    assert parse_page_id("200 HEAD 42") is None
+    assert parse_page_id("200 GET -") is None
+
+
+def test_follow_file_reads_old_file_to_the_end_on_rotation(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_impression_log, "POLL_INTERVAL", 0)
+    log = tmp_path / "impressions.log"
+    log.write_text("200 GET 1\n")
+    lines = FollowFile(str(log), from_start=True)
+    assert next(lines) == "200 GET 1\n"
+    assert next(lines) is None
+
+    # Written after the last read, then rotated before nginx reopened its logs;
+    # a half-written line waits until it is complete
+    with log.open("a") as fh:
+        fh.write("200 GET 2\n")
+    log.rename(tmp_path / "impressions.log.1")
+    log.write_text("200 GET 3\n200 GE")
+    assert next(lines) == "200 GET 2\n"
+    assert next(lines) == "200 GET 3\n"
+    assert next(lines) is None
+    assert lines.position == (log.stat().st_ino, len("200 GET 3\n"))
+    lines.close()
+
+
+@pytest.mark.django_db
+@override_settings(IMPRESSIONS_SOURCE="log")
+def test_ingest_impression_log_resumes_from_saved_position(fake_redis, tmp_path):
+    page = Page.objects.create(title="P")
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    PageContent.objects.create(page=page, content_object=video)
+    log, state = tmp_path / "impressions.log", tmp_path / "impressions.pos"
+    log.write_text(f"200 GET {page.id}\n" * 2)
+
+    options = {"file": str(log), "state": str(state), "once": True}
+    call_command("ingest_impression_log", from_start=True, **options)
+    # Written while the ingester was down: counted on the next start
+    with log.open("a") as fh:
+        fh.write(f"200 GET {page.id}\n")
+    call_command("ingest_impression_log", **options)
+
+    key = "views:counter:pages.videocontent"
+    assert fake_redis.hgetall(key) == {str(video.id).encode(): b"3"}
+
+
+@pytest.mark.django_db
+@override_settings(IMPRESSIONS_SOURCE="log")
+def test_ingest_impression_log_flushes_buffer_on_sigterm(fake_redis, monkeypatch):
+    page = Page.objects.create(title="P")
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    PageContent.objects.create(page=page, content_object=video)
+
+    def datagrams(sock):
+        yield f"200 GET {page.id}"
+        os.kill(os.getpid(), signal.SIGTERM)
+        while True:
+            yield None
+
+    monkeypatch.setattr(ingest_impression_log, "read_socket", datagrams)
+    previous = signal.getsignal(signal.SIGTERM)
+    call_command("ingest_impression_log", udp="127.0.0.1:0", flush_interval=60)
+    assert signal.getsignal(signal.SIGTERM) == previous
+    assert fake_redis.hgetall("views:counter:pages.videocontent") == {
+        str(video.id).encode(): b"1"
+    }
+
+
+@pytest.mark.django_db
+@override_settings(IMPRESSIONS_SOURCE="log")
+def test_ingest_impression_log_batches_into_counter_hashes(fake_redis, tmp_path):
+    page = Page.objects.create(title="P")
+    video = VideoContent.objects.create(title="V", file_url="http://e.com/v.mp4")
+    audio = AudioContent.objects.create(title="A", text="t")
+    PageContent.objects.create(page=page, content_object=video)
+    PageContent.objects.create(page=page, content_object=audio)
+    empty = Page.objects.create(title="Empty")
+
+    log = tmp_path / "impressions.log"
+    log.write_text(
+        f"200 GET {page.id}\n304 GET {page.id}\n500 GET {page.id}\n"
+        f"200 GET {empty.id}\n200 GET 999999\n"
+    )
+    call_command("ingest_impression_log", file=str(log), from_start=True, once=True)
+
+    assert fake_redis.hgetall("views:counter:pages.videocontent") == {
+        str(video.id).encode(): b"2"
+    }
+    assert fake_redis.hgetall("views:counter:pages.audiocontent") == {
+        str(audio.id).encode(): b"2"
+    }
+    assert fake_redis.smembers("views:labels") == {
+        b"pages.videocontent",
+        b"pages.audiocontent",
+    }
+
+
+@pytest.mark.django_db
+def test_import_content_upserts_by_external_id_and_links_pages(tmp_path):
+    src = tmp_path / "catalogue.jsonl"
+    src.write_text(
+        "\n".join(
+            [
+                '{"type": "page", "external_id": "p1", "title": "Home"}',
+                '{"type": "video", "external_id": "v1", "title": "V1",'
+                ' "file_url": "http://e.com/1.mp4", "pages": ["p1"]}',
+                '{"type": "audio", "external_id": "a1", "title": "A1",'
+                ' "text": "t", "pages": ["p1", "missing"]}',
+                '{"type": "image", "external_id": "i1"}',
+            ]
+        )
+    )
+    call_command("import_content", str(src), batch_size=2)
+    page = Page.objects.get(external_id="p1")
+    assert [pc.content_object.title for pc in page.contents.all()] == ["V1", "A1"]
+
+    VideoContent.objects.filter(external_id="v1").update(counter=5)
+    src.write_text(
+        '{"type": "video", "external_id": "v1", "title": "V1 (new)",'
+        ' "file_url": "http://e.com/1.mp4", "pages": ["p1"]}\n'
+    )
+    call_command("import_content", str(src))
+    video = VideoContent.objects.get()
+    assert video.title == "V1 (new)"
+    assert video.counter == 5
+    assert PageContent.objects.count() == 2
+    assert Page.objects.get(pk=page.pk).updated_at > page.updated_at
+
+
+@pytest.mark.django_db
+def test_import_content_reads_csv(tmp_path):
+    Page.objects.create(title="P", external_id="p1")
+    src = tmp_path / "catalogue.csv"
+    src.write_text(
+        "type,external_id,title,file_url,subtitles_url,text,pages\n"
+        "video,v1,V1,http://e.com/1.mp4,,,p1\n"
+        "audio,a1,A1,,,hello,p1\n"
+    )
+    call_command("import_content", str(src))
+    assert VideoContent.objects.get().subtitles_url == ""
+    assert AudioContent.objects.get().text == "hello"
+    assert PageContent.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_content_skips_records_the_database_would_reject(tmp_path):
+    src = tmp_path / "catalogue.jsonl"
+    src.write_text(
+        '{"type": "page", "external_id": "p1", "title": "Home"}\n'
+        '{"type": "page", "external_id": "p2", "title": null}\n'
+        '{"type": "page", "external_id": "p3", "title": "%s"}\n'
+        '["not", "a", "record"]\n' % ("x" * 256)
+    )
+    err = StringIO()
+    call_command("import_content", str(src), verbosity=2, stderr=err)
+    assert list(Page.objects.values_list("external_id", flat=True)) == ["p1"]
+    assert "Line 2: title may not be null" in err.getvalue()
+    assert "Line 3: title is longer than 255 characters" in err.getvalue()
+    assert "3 invalid records skipped" in err.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_content_errors_name_the_failing_lines(tmp_path, monkeypatch):
+    from django.db import IntegrityError
+
+    from pages.management.commands.import_content import Command
+
+    src = tmp_path / "catalogue.jsonl"
+    good = '{"type": "page", "external_id": "p%d", "title": "P"}\n'
+    src.write_text("".join(good % i for i in range(5)) + "{oops\n")
+    with pytest.raises(CommandError, match="^Line 6: "):
+        call_command("import_content", str(src), batch_size=2)
+
+    original = Command.upsert
+
+    def upsert(self, model, rows):
+        if "p3" in rows:
+            raise IntegrityError("boom")
+        return original(self, model, rows)
+
+    monkeypatch.setattr(Command, "upsert", upsert)
+    src.write_text("".join(good % i for i in range(5)))
+    with pytest.raises(CommandError, match="^Lines 3-4 rolled back: boom"):
+        call_command("import_content", str(src), batch_size=2)
+
+
+@pytest.mark.django_db
+def test_generate_content_bulk_creates_pages_with_type_mix():
+    call_command(
+        "generate_content",
+        pages=5,
+        contents="3",
+        distribution="fixed",
+        mix="video=1,audio=0",
+        batch_size=2,
+        seed=1,
+    )
+    assert Page.objects.count() == 5
+    assert VideoContent.objects.count() == 15
+    assert not AudioContent.objects.exists()
+    for page in Page.objects.prefetch_related("contents"):
+        assert len(page.contents.all()) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_reports_per_endpoint(live_server, django_user_model):
+    django_user_model.objects.create_superuser("admin", "a@example.com", "pw")
+    call_command("generate_content", pages=12, contents="1-3", seed=1)
+    out = StringIO()
+    call_command(
+        "loadtest",
+        url=live_server.url,
+        duration=0.5,
+        concurrency=2,
+        mix="list=1,detail=1,autocomplete=1",
+        admin_user="admin",
+        admin_password="pw",
+        stdout=out,
+    )
+    report = out.getvalue()
+    assert "Sampled 12 page ids" in report
+    assert re.search(r"^detail\s+\d+\s+0\s", report, re.M)
+    assert re.search(r"^list\s+\d+\s+0\s", report, re.M)
+    assert re.search(r"^autocomplete\s+\d+\s+0\s", report, re.M)
+
+
+def test_parse_importtime_and_profile_imports_report():
+    from pages.management.commands.profile_imports import parse_importtime
+
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   yaml._yaml\n"
+        "import time:       300 |        420 | yaml\n"
+    )
+    assert parse_importtime(stderr) == [("yaml._yaml", 120, 120), ("yaml", 300, 420)]
+
+    out = StringIO()
+    call_command("profile_imports", target="setup", runs=1, top=5, stdout=out)
+    report = out.getvalue()
+    assert report.startswith("setup: ")
+    assert "django" in report
+
+
+def test_import_content_copy_staging_table_holds_only_copied_columns():
+    from pages.management.commands.import_content import (
+        copy_upsert_sql,
+        import_fields,
+    )
+
+    fields = [
+        VideoContent._meta.get_field(name)
+        for name in ["external_id", *import_fields(VideoContent)]
+    ]
+    create_sql, copy_sql, upsert_sql, _ = copy_upsert_sql(VideoContent, fields)
+    assert "LIKE" not in create_sql
+    assert create_sql.endswith("WITH NO DATA")
+    assert '"id"' not in create_sql and '"counter"' not in create_sql
+    assert '"counter"' not in copy_sql
+    assert '"counter") SELECT' in upsert_sql and ", 0 FROM" in upsert_sql
+    assert '"counter" = EXCLUDED' not in upsert_sql
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="--copy needs PostgreSQL")
+def test_import_content_copy_on_postgres(tmp_path):
+    src = tmp_path / "catalogue.jsonl"
+    src.write_text(
+        '{"type": "page", "external_id": "p1", "title": "Home"}\n'
+        '{"type": "audio", "external_id": "a1", "title": "A1", "text": "t",'
+        ' "pages": ["p1"]}\n'
+    )
+    call_command("import_content", str(src), copy=True)
+    call_command("import_content", str(src), copy=True)
+    assert AudioContent.objects.get().counter == 0
+    assert PageContent.objects.count() == 1
@@ -0,0 +1,122 @@
+import contextlib
+import time
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pages import health
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    calls = []
+
+    def ok(name):
+        return lambda: calls.append(name)
+
+    monkeypatch.setattr(
+        health,
+        "PROBES",
+        {name: ok(name) for name in ("db", "broker", "counter_redis")},
+    )
+    monkeypatch.setattr(health, "_CACHE", {"at": 0.0, "result": None})
+    return calls
+
+
+@pytest.mark.django_db
+def test_ready_reports_latency_and_backlog_and_caches(fake_redis, probes):
+    fake_redis.hincrby("views:counter:pages.videocontent", 1, 1)
+    fake_redis.hincrby("views:counter:pages.videocontent", 2, 1)
+    fake_redis.sadd("views:labels", "pages.videocontent")
+    fake_redis.hincrby("views:counter:pages.videocontent:flush:abc", 3, 1)
+    fake_redis.sadd("views:flush:keys", "views:counter:pages.videocontent:flush:abc")
+
+    client = APIClient()
+    resp = client.get(reverse("ready"))
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "ok"
+    assert set(data["checks"]) == {"db", "broker", "counter_redis"}
+    assert all("latency_ms" in c for c in data["checks"].values())
+    assert data["backlog"] == {"pending_ids": 2, "flush_keys": 1}
+    assert data["cached"] is False
+
+    resp = client.get(reverse("ready"))
+    assert resp.json()["cached"] is True
+    assert len(probes) == 3
+
+
+@pytest.mark.django_db
+def test_ready_returns_503_when_dependency_is_down(fake_redis, probes, monkeypatch):
+    def down():
+        raise ConnectionError("broker down")
+
+    monkeypatch.setitem(health.PROBES, "broker", down)
+    resp = APIClient().get(reverse("ready"))
+    assert resp.status_code == 503
+    data = resp.json()
+    assert data["status"] == "fail"
+    assert data["checks"]["broker"] == {
+        "ok": False,
+        "error": "ConnectionError",
+        "latency_ms": data["checks"]["broker"]["latency_ms"],
+    }
+    assert data["checks"]["db"]["ok"] is True
+
+
+@override_settings(READINESS_PROBE_TIMEOUT=0.5)
+def test_db_probe_connects_with_timeouts(monkeypatch):
+    calls = []
+
+    class Cursor:
+        def execute(self, sql):
+            calls.append(sql)
+
+    class Conn:
+        def cursor(self):
+            return contextlib.nullcontext(Cursor())
+
+        def close(self):
+            calls.append("close")
+
+    class Database:
+        @staticmethod
+        def connect(**params):
+            calls.append(params)
+            return Conn()
+
+    class Wrapper:
+        vendor = "postgresql"
+
+        def get_connection_params(self):
+            return {"host": "db", "dbname": "app"}
+
+    Wrapper.Database = Database
+    monkeypatch.setattr(health, "connection", Wrapper())
+
+    health._probe_db()
+    assert calls == [
+        {
+            "host": "db",
+            "dbname": "app",
+            "connect_timeout": 1,
+            "options": "-c statement_timeout=500",
+        },
+        "SELECT 1",
+        "close",
+    ]
+
+
+@override_settings(READINESS_PROBE_TIMEOUT=0.5)
+def test_broker_probe_fails_within_the_timeout(monkeypatch):
+    from config.celery import app
+
+    # Nothing listens on port 1: the connection is refused straight away
+    monkeypatch.setattr(app.conf, "broker_url", "redis://127.0.0.1:1/0")
+    monkeypatch.setattr(app.conf, "broker_write_url", "redis://127.0.0.1:1/0")
+    start = time.perf_counter()
+    with pytest.raises(Exception):
+        health._probe_broker()
+    assert time.perf_counter() - start < 0.5
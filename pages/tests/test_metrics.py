@@ -0,0 +1,85 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pages import metrics
+from pages.models import Page
+
+
+@pytest.mark.django_db
+@override_settings(METRICS_MULTIPROC_DIRS=[], COUNTER_FLUSH_ORPHAN_AGE=300)
+def test_metrics_reports_requests_and_counter_backlog(fake_redis):
+    Page.objects.create(title="P")
+    client = APIClient()
+    assert client.get(reverse("page-list")).status_code == 200
+
+    fake_redis.hincrby("views:counter:pages.videocontent", 1, 1)
+    fake_redis.hincrby("views:counter:pages.videocontent", 2, 1)
+    fake_redis.sadd("views:labels", "pages.videocontent")
+    fake_redis.hincrby("views:counter:pages.audiocontent:flush:old", 1, 1)
+    fake_redis.idle[b"views:counter:pages.audiocontent:flush:old"] = 600
+    fake_redis.hincrby("views:counter:pages.audiocontent:flush:new", 1, 1)
+    fake_redis.sadd(
+        "views:flush:keys",
+        "views:counter:pages.audiocontent:flush:old",
+        "views:counter:pages.audiocontent:flush:new",
+    )
+
+    resp = client.get(reverse("metrics"))
+    assert resp.status_code == 200
+    body = resp.content.decode()
+    assert (
+        'contenthub_request_duration_seconds_count{action="list",view="PageViewSet"}'
+        in body
+    )
+    assert (
+        'contenthub_request_db_queries_count{action="list",view="PageViewSet"}' in body
+    )
+    assert 'contenthub_counter_pending_ids{label="pages.videocontent"} 2.0' in body
+    assert "contenthub_counter_orphaned_flush_keys 1.0" in body
+    assert "contenthub_counter_redis_up 1.0" in body
+
+
+def test_metrics_reads_existing_and_replica_multiprocess_dirs(
+    fake_redis, tmp_path, monkeypatch
+):
+    for name in ("web", "flush/a1", "flush/b2"):
+        (tmp_path / name).mkdir(parents=True)
+    read = []
+    monkeypatch.setattr(
+        metrics.multiprocess,
+        "MultiProcessCollector",
+        lambda registry, path: read.append(path),
+    )
+    dirs = [str(tmp_path / d) for d in ("web", "celery", "flush/*", "ingest/*")]
+    with override_settings(METRICS_MULTIPROC_DIRS=dirs):
+        assert APIClient().get(reverse("metrics")).status_code == 200
+    assert read == [str(tmp_path / d) for d in ("flush/a1", "flush/b2", "web")]
+
+
+def test_reset_multiprocess_dir_drops_stale_files(tmp_path, monkeypatch):
+    path = tmp_path / "web"
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(path))
+    metrics.reset_multiprocess_dir()
+    (path / "counter_123.db").write_bytes(b"")
+    (path / "keep.txt").write_text("x")
+
+    metrics.reset_multiprocess_dir()
+
+    assert sorted(p.name for p in path.iterdir()) == ["keep.txt"]
+
+
+@override_settings(
+    COUNTER_REDIS_URL="redis://127.0.0.1:1/0", READINESS_PROBE_TIMEOUT=0.2
+)
+def test_counter_backlog_scrape_uses_short_timeout_client(monkeypatch):
+    from pages import health
+
+    monkeypatch.setattr(health, "_COUNTER_REDIS", None)
+    families = {f.name: f for f in metrics.CounterBacklogCollector().collect()}
+
+    assert families["contenthub_counter_redis_up"].samples[0].value == 0
+    pool = health._COUNTER_REDIS.connection_pool
+    assert pool.connection_kwargs["socket_timeout"] == 0.2
+    assert pool.connection_kwargs["socket_connect_timeout"] == 0.2
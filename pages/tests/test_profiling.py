@@ -0,0 +1,47 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from pages.models import Page
+from pages.profiling import slow_requests
+
+
+@pytest.mark.django_db
+def test_profiler_is_dropped_when_disabled():
+    Page.objects.create(title="P")
+    resp = APIClient().get(reverse("page-list"))
+    assert resp.status_code == 200
+    assert "Server-Timing" not in resp
+
+
+@pytest.mark.django_db
+@override_settings(
+    REQUEST_PROFILER_ENABLED=True,
+    REQUEST_PROFILER_SLOW_MS=0,
+    REQUEST_PROFILER_BUFFER_SIZE=2,
+)
+def test_profiler_emits_server_timing_and_samples_slow_requests(fake_redis):
+    page = Page.objects.create(title="P")
+    client = APIClient()
+    resp = client.get(reverse("page-detail", args=[page.id]))
+    timing = resp["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    for name in ("serialize;dur=", "render;dur=", "total;dur="):
+        assert name in timing
+
+    client.get(reverse("page-list"))
+    client.get(reverse("page-list"))
+    entries = slow_requests()
+    assert len(entries) == 2
+    assert entries[0]["total_ms"] >= entries[1]["total_ms"]
+    assert entries[0]["queries"] == len(entries[0]["sql"]) > 0
+
+    admin = get_user_model().objects.create_superuser("admin", "a@e.com", "pw")
+    client.force_login(admin)
+    resp = client.get(reverse("admin:pages_page_slow_requests"))
+    assert resp.status_code == 200
+    assert "/api/v1/pages/" in resp.content.decode()
+    resp = client.get(reverse("admin:pages_page_changelist"))
+    assert reverse("admin:pages_page_slow_requests") in resp.content.decode()
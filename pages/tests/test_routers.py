@@ -0,0 +1,92 @@
+from django.test import override_settings
+
+from config import routers
+from pages.models import Page
+
+
+def _router(monkeypatch, lags):
+    def lag(alias):
+        if isinstance(lags[alias], Exception):
+            raise lags[alias]
+        return lags[alias]
+
+    monkeypatch.setattr(routers, "replica_lag", lag)
+    monkeypatch.setattr(routers, "_LAG_STATE", {})
+    return routers.ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=["replica0", "replica1"])
+def test_reads_use_primary_unless_opted_in(monkeypatch):
+    router = _router(monkeypatch, {"replica0": 0, "replica1": 0})
+    assert router.db_for_read(Page) == "default"
+    with routers.read_from_replica():
+        assert router.db_for_read(Page) in {"replica0", "replica1"}
+        assert router.db_for_write(Page) == "default"
+    assert router.db_for_read(Page) == "default"
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica0", "replica1"],
+    DATABASE_REPLICA_MAX_LAG=5,
+    DATABASE_REPLICA_LAG_CHECK_INTERVAL=60,
+)
+def test_lagging_or_broken_replicas_fall_back_to_primary(monkeypatch):
+    lags = {"replica0": 30.0, "replica1": 1.0}
+    router = _router(monkeypatch, lags)
+    with routers.read_from_replica():
+        assert router.db_for_read(Page) == "replica1"
+
+    monkeypatch.setattr(routers, "_LAG_STATE", {})
+    lags["replica1"] = routers.DatabaseError("down")
+    with routers.read_from_replica():
+        assert router.db_for_read(Page) == "default"
+
+
+@override_settings(DATABASE_REPLICAS=[f"replica{i}" for i in range(5)])
+def test_one_replica_serves_a_whole_block(monkeypatch):
+    router = _router(monkeypatch, {f"replica{i}": 0 for i in range(5)})
+    picks = set()
+    for _ in range(20):
+        with routers.read_from_replica():
+            block = {router.db_for_read(Page) for _ in range(10)}
+        assert len(block) == 1
+        picks |= block
+    assert len(picks) > 1
+
+
+def test_replica_lag_check_is_time_bounded(monkeypatch):
+    executed = []
+
+    class Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            executed.append((sql, params))
+
+        def fetchone(self):
+            return (0.5,)
+
+    class Conn:
+        vendor = "postgresql"
+
+        def cursor(self):
+            return Cursor()
+
+    monkeypatch.setattr(routers, "connections", {"replica0": Conn()})
+    with override_settings(DATABASE_REPLICA_CONNECT_TIMEOUT=3):
+        assert routers.replica_lag("replica0") == 0.5
+    assert executed == [
+        ("SET statement_timeout = %s", [3000]),
+        (routers._LAG_SQL, None),
+        ("RESET statement_timeout", None),
+    ]
+
+
+def test_only_primary_is_migrated():
+    router = routers.ReplicaRouter()
+    assert router.allow_migrate("default", "pages")
+    assert not router.allow_migrate("replica0", "pages")
@@ -0,0 +1,172 @@
+import pytest
+from django.test import override_settings
+
+from pages import tasks
+from pages.models import AudioContent, VideoContent
+
+
+@pytest.mark.django_db
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+def test_flush_impressions_fans_out_per_label_and_chunk(fake_redis, monkeypatch):
+    videos = [
+        VideoContent.objects.create(title=f"V{i}", file_url="http://e.com/v.mp4")
+        for i in range(5)
+    ]
+    audio = AudioContent.objects.create(title="A", text="t")
+    for v in videos:
+        fake_redis.hincrby("views:counter:pages.videocontent", v.id, 2)
+    fake_redis.hincrby("views:counter:pages.audiocontent", audio.id, 3)
+    fake_redis.sadd("views:labels", "pages.videocontent", "pages.audiocontent")
+
+    chunks = []
+    original = tasks.flush_chunk.apply_async
+
+    def record(args, **kwargs):
+        chunks.append(args)
+        return original(args, **kwargs)
+
+    monkeypatch.setattr(tasks.flush_chunk, "apply_async", record)
+    tasks.flush_impressions(batch_size=2)
+
+    assert (
+        sorted(label for label, _ in chunks)
+        == ["pages.audiocontent"] + ["pages.videocontent"] * 3
+    )
+    for _, rows in chunks:
+        assert [pk for pk, _ in rows] == sorted(pk for pk, _ in rows)
+    assert all(v.counter == 2 for v in VideoContent.objects.all())
+    audio.refresh_from_db()
+    assert audio.counter == 3
+    # Temp keys, their tracking set and writer slots are cleaned up
+    assert fake_redis.scard("views:flush:keys") == 0
+    assert not [k for k in fake_redis.data if ":flush:" in k]
+
+
+@pytest.mark.django_db
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+def test_redelivered_flush_label_publishes_only_unflushed_chunks(
+    fake_redis, monkeypatch
+):
+    videos = [
+        VideoContent.objects.create(title=f"V{i}", file_url="http://e.com/v.mp4")
+        for i in range(4)
+    ]
+    tmp = "views:counter:pages.videocontent:flush:abc"
+    for v in videos:
+        fake_redis.hincrby(tmp, v.id, 1)
+    fake_redis.sadd("views:flush:keys", tmp)
+
+    original = tasks.flush_chunk.apply_async
+    published, crashes = [], [ConnectionError("worker lost")]
+
+    def crash_on_second_chunk(args, **kwargs):
+        if len(published) == 1 and crashes:
+            raise crashes.pop()
+        published.append(args)
+        return original(args, **kwargs)
+
+    monkeypatch.setattr(tasks.flush_chunk, "apply_async", crash_on_second_chunk)
+    with pytest.raises(ConnectionError):
+        tasks.flush_label("pages.videocontent", tmp, batch_size=2)
+    assert fake_redis.hlen(tmp) == 2
+
+    # Re-delivery: the first chunk is already gone from the temp key
+    tasks.flush_label("pages.videocontent", tmp, batch_size=2)
+    assert len(published) == 2
+    assert all(v.counter == 1 for v in VideoContent.objects.all())
+    assert tmp not in fake_redis.data
+    assert fake_redis.scard("views:flush:keys") == 0
+
+
+def test_flush_chunk_retries_db_errors_then_drops_and_counts(fake_redis, monkeypatch):
+    from django.db import OperationalError
+
+    from pages.metrics import FLUSH_DROPPED
+
+    monkeypatch.setattr(tasks, "_FLUSH_DB_RETRIES", 2)
+    failures = [OperationalError("server closed the connection")] * 2
+    applied = []
+
+    def write(label, deltas):
+        if failures:
+            raise failures.pop()
+        applied.append(deltas)
+        return len(deltas)
+
+    monkeypatch.setattr(tasks, "_flush_label_to_db", write)
+    tasks.flush_chunk.apply(args=("pages.videocontent", [[1, 3]]))
+    assert applied == [{1: 3}]
+
+    dropped = FLUSH_DROPPED.labels("pages.videocontent")
+    before = dropped._value.get()
+    failures[:] = [OperationalError("down")] * 3
+    result = tasks.flush_chunk.apply(args=("pages.videocontent", [[1, 3], [2, 4]]))
+    assert isinstance(result.result, OperationalError)
+    assert dropped._value.get() - before == 7
+    assert applied == [{1: 3}]
+    # Writer slots are released on every attempt
+    assert not [k for k in fake_redis.data if k.startswith("views:flush:writer")]
+
+
+def test_writer_slots_limit_concurrent_db_writers(fake_redis, monkeypatch):
+    monkeypatch.setattr(tasks, "_FLUSH_MAX_WRITERS", 1)
+    fake_redis.set(tasks._writer_slot_key(0), "other")
+    assert tasks._acquire_writer_slot() is None
+
+    fake_redis.delete(tasks._writer_slot_key(0))
+    slot = tasks._acquire_writer_slot()
+    assert slot is not None
+    assert tasks._acquire_writer_slot() is None
+    tasks._release_writer_slot(slot)
+    assert tasks._acquire_writer_slot() is not None
+
+
+@override_settings(RUNNING_TESTS=False, CELERY_TASK_ALWAYS_EAGER=False)
+def test_ingest_batch_dedups_and_aggregates_into_one_pipeline(fake_redis, monkeypatch):
+    from celery import Task
+
+    from pages.management.commands.bench_ingest import _request
+
+    task = tasks.ingest_impressions
+    first = _request(task, ("pages.videocontent", [1, 2]))
+    requests = [
+        first,
+        _request(task, ("pages.videocontent", [2, 3])),
+        _request(task, ("pages.audiocontent", "oops")),
+        _request(task, ("pages.audiocontent", [7])),
+    ]
+    pipelines = []
+    original = fake_redis.pipeline
+    monkeypatch.setattr(
+        fake_redis, "pipeline", lambda **kw: pipelines.append(1) or original(**kw)
+    )
+    Task.apply(task, (requests,))
+
+    expected_video = {b"1": b"1", b"2": b"2", b"3": b"1"}
+    assert fake_redis.hgetall("views:counter:pages.videocontent") == expected_video
+    assert fake_redis.hgetall("views:counter:pages.audiocontent") == {b"7": b"1"}
+    # dedup + increments: two round trips for the whole batch
+    assert len(pipelines) == 2
+
+    # Re-delivery of an already counted message is dropped
+    pipelines.clear()
+    Task.apply(task, ([first],))
+
+    assert fake_redis.hgetall("views:counter:pages.videocontent") == expected_video
+    assert len(pipelines) == 1
+
+
+@override_settings(RUNNING_TESTS=False, CELERY_TASK_ALWAYS_EAGER=False)
+def test_bench_ingest_reports_batched_and_unbatched(fake_redis, monkeypatch):
+    from io import StringIO
+
+    import redis
+    from django.core.management import call_command
+
+    monkeypatch.setattr(redis.Redis, "from_url", lambda url: fake_redis)
+    out = StringIO()
+    call_command(
+        "bench_ingest", redis_url="redis://x/15", messages=50, batch_size=10, stdout=out
+    )
+    assert "unbatched" in out.getvalue() and "batched" in out.getvalue()
+    assert not fake_redis.hgetall("views:counter:pages.videocontent")
@@ -1,12 +1,186 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
+from datetime import datetime
 
-from django.db.models import Prefetch
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Prefetch, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+from config.routers import read_from_replica
+
+from .caching import add_cache_headers, page_content_ids
 from .models import Page, PageContent
-from .serializers import PageDetailSerializer, PageListSerializer
-from .tasks import ingest_impressions
+from .profiling import profile_span
+from .serializers import (
+    CONTENT_FIELDS,
+    CONTENT_TYPE_MODELS,
+    PageDetailSerializer,
+    PageListSerializer,
+)
+from .tasks import ingest_impression_counts, ingest_impressions
+
+
+def _content_ids(page_contents) -> dict[str, set[int]]:
+    """Group ids of content objects behind ``page_contents`` by model label."""
+    content_map: dict[str, set[int]] = defaultdict(set)
+    for pc in page_contents:
+        label = f"{pc.content_type.app_label}.{pc.content_type.model}"
+        content_map[label].add(pc.object_id)
+    return content_map
+
+
+def _parse_ids(raw: str, limit: int) -> list[int]:
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise ValidationError({"ids": "Ожидается список целых чисел через запятую."})
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise ValidationError({"ids": "Нужно указать хотя бы один id."})
+    if len(ids) > limit:
+        raise ValidationError({"ids": f"Не больше {limit} id за запрос."})
+    return ids
+
+
+def _parse_changed_since(raw: str | None) -> datetime | None:
+    if not raw:
+        return None
+    try:
+        value = parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({"changed_since": "Ожидается дата и время в ISO 8601."})
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def _timestamp(value: datetime | None) -> int | None:
+    return int(value.timestamp()) if value is not None else None
+
+
+def _version(value: datetime | None) -> int:
+    """``value`` in whole microseconds, for ETags (``Last-Modified`` is seconds)."""
+    if value is None:
+        return 0
+    return int(value.timestamp()) * 1_000_000 + value.microsecond
+
+
+def _counter_total(content_ids: dict[str, set[int]]) -> int:
+    """Sum of ``counter`` over the given content objects, one query per type."""
+    total = 0
+    for label, ids in content_ids.items():
+        rows = apps.get_model(label)._base_manager.filter(pk__in=ids)
+        total += rows.aggregate(total=Sum("counter"))["total"] or 0
+    return total
+
+
+def _detail_etag(updated_at: datetime, counters: int | None) -> str:
+    # Flushes move counters without bumping updated_at, so while counters are
+    # in the body their total is part of the validator
+    suffix = "" if counters is None else f"-{counters}"
+    return f'W/"{_version(updated_at)}{suffix}"'
+
+
+def _impressions_source() -> str:
+    return getattr(settings, "IMPRESSIONS_SOURCE", "request")
+
+
+def _with_validators(response, last_modified: int | None, etag: str | None = None):
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    if etag is not None:
+        response["ETag"] = etag
+    return response
+
+
+def _parse_csv(raw: str | None) -> set[str] | None:
+    if raw is None:
+        return None
+    return {part.strip() for part in raw.split(",") if part.strip()}
+
+
+def _content_selection(params) -> tuple[list, set[str] | None] | None:
+    """Parse ``?types=`` / ``?fields=`` into (content models, field names).
+
+    Returns ``None`` when neither is given so the default full-detail path
+    is used unchanged.
+    """
+    types = _parse_csv(params.get("types"))
+    fields = _parse_csv(params.get("fields"))
+    if types is None and fields is None:
+        return None
+    if types is None:
+        models = list(CONTENT_TYPE_MODELS.values())
+    else:
+        unknown = types - CONTENT_TYPE_MODELS.keys()
+        if unknown:
+            raise ValidationError(
+                {"types": f"Неизвестные типы: {', '.join(sorted(unknown))}."}
+            )
+        models = [CONTENT_TYPE_MODELS[name] for name in sorted(types)]
+    if fields is not None:
+        unknown = fields - CONTENT_FIELDS
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Неизвестные поля: {', '.join(sorted(unknown))}."}
+            )
+    return models, fields
+
+
+def _load_content_objects(page_contents, fields: set[str] | None) -> None:
+    """Resolve ``content_object`` with one ``.only()`` query per content type.
+
+    Stands in for the generic prefetch, which cannot defer columns, so that
+    e.g. ``AudioContent.text`` is never read when it was not asked for.
+    """
+    by_ct: dict[ContentType, list[PageContent]] = defaultdict(list)
+    for pc in page_contents:
+        by_ct[pc.content_type].append(pc)
+    cache = PageContent._meta.get_field("content_object")
+    for ct, pcs in by_ct.items():
+        model = ct.model_class()
+        qs = model._base_manager.filter(pk__in={pc.object_id for pc in pcs})
+        if fields is not None:
+            # "pk" keeps e.g. ?fields=type from falling back to every column
+            qs = qs.only("pk", *[name for name in fields if _has_field(model, name)])
+        objects = {obj.pk: obj for obj in qs}
+        for pc in pcs:
+            cache.set_cached_value(pc, objects.get(pc.object_id))
+
+
+def _has_field(model, name: str) -> bool:
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+class _CountedPagination(PageNumberPagination):
+    """Page-number pagination that can reuse a row count the view already has."""
+
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count  # cached_property: skips COUNT(*)
+        return paginator
 
 
 class PageViewSet(viewsets.ReadOnlyModelViewSet):
@@ -19,6 +193,19 @@ class PageViewSet(viewsets.ReadOnlyModelViewSet):
       explicit relations.
     - On retrieve, impressions are aggregated asynchronously via Celery to
       avoid adding latency to the API response.
+    - ``bulk`` returns many detail pages in one round trip: the generic
+      prefetch resolves content with one query per content type across all
+      requested pages and impressions go out as a single ingest task.
+    - ``retrieve`` accepts ``?types=video,audio`` and ``?fields=title,...``;
+      excluded content types are not queried at all and content rows are
+      loaded with ``.only()`` the requested columns.
+    - ``list`` supports ``?changed_since=`` for incremental sync and answers
+      ``If-Modified-Since``/``If-None-Match`` from ``Page.updated_at``.
+      View counters do not bump ``updated_at``, so ``retrieve`` (whose body
+      has counters) only sends an ETag over ``updated_at`` and the counter
+      total, answered without loading content rows.
+    - Reads are served from ``DATABASE_REPLICAS`` when configured (see
+      ``config.routers``); the primary only carries writes.
     """
 
     queryset = Page.objects.all().prefetch_related(
@@ -30,17 +217,209 @@ class PageViewSet(viewsets.ReadOnlyModelViewSet):
         )
     )
 
+    pagination_class = _CountedPagination
+    bulk_max_ids = 50
+    content_selection = None
+
+    def dispatch(self, request, *args, **kwargs):
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if self.action == "list":
+            # List items carry no contents; skip the prefetch entirely
+            queryset = Page.objects.all()
+            changed_since = _parse_changed_since(
+                self.request.query_params.get("changed_since")
+            )
+            if changed_since is not None:
+                queryset = queryset.filter(updated_at__gt=changed_since)
+            return queryset
+        if self.content_selection is None:
+            return super().get_queryset()
+        return Page.objects.prefetch_related(
+            Prefetch("contents", queryset=self._contents_queryset())
+        )
+
+    def _contents_queryset(self):
+        queryset = PageContent.objects.select_related("content_type").order_by("id")
+        if self.content_selection is not None:
+            models, _fields = self.content_selection
+            cts = ContentType.objects.get_for_models(*models).values()
+            queryset = queryset.filter(content_type__in=list(cts))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.content_selection is not None:
+            context["content_fields"] = self.content_selection[1]
+        return context
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.action in ("list", "retrieve") and response.status_code in (200, 304):
+            keys = ["pages"] if self.action == "list" else [f"page-{self.kwargs['pk']}"]
+            add_cache_headers(request, response, keys)
+        return response
+
     def get_serializer_class(self):
-        if self.action == "retrieve":
+        if self.action in ("retrieve", "bulk"):
             return PageDetailSerializer
         return PageListSerializer
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "changed_since",
+                OpenApiTypes.DATETIME,
+                description="Only pages updated after this ISO 8601 timestamp.",
+            )
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        # One index-backed query answers conditional GETs for the whole list;
+        # the count in the ETag catches deletions that Last-Modified cannot.
+        state = queryset.aggregate(last=Max("updated_at"), total=Count("id"))
+        last_modified = _timestamp(state["last"])
+        # Full precision: an edit within the same second still changes the ETag
+        etag = f'W/"{state["total"]}-{_version(state["last"])}"'
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        if self.paginator is not None:
+            self.paginator.known_count = state["total"]
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with profile_span(request, "serialize"):
+                data = self.get_serializer(page, many=True).data
+            response = self.get_paginated_response(data)
+        else:
+            with profile_span(request, "serialize"):
+                data = self.get_serializer(queryset, many=True).data
+            response = Response(data)
+        return _with_validators(response, last_modified, etag)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "types",
+                str,
+                description="Comma-separated content types to include, e.g. video,audio.",
+            ),
+            OpenApiParameter(
+                "fields",
+                str,
+                description="Comma-separated content item fields; id and type are always set.",
+            ),
+        ]
+    )
     def retrieve(self, request, *args, **kwargs):
+        self.content_selection = _content_selection(request.query_params)
+        fields = self.content_selection and self.content_selection[1]
+        with_counters = fields is None or "counter" in fields
+        if "HTTP_IF_NONE_MATCH" in request.META:
+            pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            try:
+                updated_at = (
+                    Page.objects.filter(pk=pk)
+                    .values_list("updated_at", flat=True)
+                    .first()
+                )
+            except (TypeError, ValueError):
+                # Malformed pk: let get_object() answer 404
+                updated_at = None
+            if updated_at is not None:
+                content_ids = _content_ids(self._contents_queryset().filter(page_id=pk))
+                counters = _counter_total(content_ids) if with_counters else None
+                not_modified = get_conditional_response(
+                    request, etag=_detail_etag(updated_at, counters)
+                )
+                if not_modified is not None:
+                    # The client still shows the page: count it without
+                    # loading content objects.
+                    if _impressions_source() == "request":
+                        for label, ids in content_ids.items():
+                            ingest_impressions.delay(label, list(ids))
+                    return not_modified
+
         page: Page = self.get_object()
-        content_map: dict[str, set[int]] = defaultdict(set)
-        for pc in page.contents.all():
-            label = f"{pc.content_type.app_label}.{pc.content_type.model}"
-            content_map[label].add(pc.object_id)
-        for label, ids in content_map.items():
-            ingest_impressions.delay(label, list(ids))
-        return Response(self.get_serializer(page).data)
+        if self.content_selection is not None:
+            _load_content_objects(page.contents.all(), self.content_selection[1])
+        if _impressions_source() == "request":
+            for label, ids in _content_ids(page.contents.all()).items():
+                ingest_impressions.delay(label, list(ids))
+        with profile_span(request, "serialize"):
+            data = self.get_serializer(page).data
+        counters = None
+        if with_counters:
+            loaded = {
+                (pc.content_type_id, pc.object_id): pc.content_object.counter
+                for pc in page.contents.all()
+                if pc.content_object is not None
+            }
+            counters = sum(loaded.values())
+        return _with_validators(
+            Response(data), None, _detail_etag(page.updated_at, counters)
+        )
+
+    @extend_schema(request=None, responses={204: None})
+    @action(
+        detail=True,
+        methods=["post"],
+        authentication_classes=[],
+        permission_classes=[],
+    )
+    def impression(self, request, *args, **kwargs):
+        """Impression beacon for detail views served from an upstream cache.
+
+        nginx mirrors every detail request here (see ``nginx/nginx.conf``);
+        clients may also call it directly. Only counts when
+        ``IMPRESSIONS_SOURCE`` is ``"beacon"``; otherwise it is a no-op.
+        """
+        if _impressions_source() == "beacon":
+            try:
+                page_id = int(kwargs["pk"])
+            except ValueError:
+                raise NotFound()
+            content_ids = page_content_ids(page_id)
+            if content_ids:
+                ingest_impression_counts.delay(
+                    {
+                        label: {object_id: 1 for object_id in ids}
+                        for label, ids in content_ids.items()
+                    }
+                )
+        return Response(status=204)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                str,
+                required=True,
+                description="Comma-separated page ids (up to 50).",
+            )
+        ],
+        responses=PageDetailSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"], pagination_class=None)
+    def bulk(self, request, *args, **kwargs):
+        ids = _parse_ids(request.query_params.get("ids", ""), self.bulk_max_ids)
+        by_id = {page.id: page for page in self.get_queryset().filter(id__in=ids)}
+        pages = [by_id[pk] for pk in ids if pk in by_id]
+
+        counts: dict[str, Counter] = defaultdict(Counter)
+        for page in pages:
+            for label, object_ids in _content_ids(page.contents.all()).items():
+                counts[label].update(object_ids)
+        if counts:
+            ingest_impression_counts.delay(
+                {label: dict(per_id) for label, per_id in counts.items()}
+            )
+        with profile_span(request, "serialize"):
+            data = self.get_serializer(pages, many=True).data
+        return Response(data)